@@ -0,0 +1,237 @@
+# audio_cache.py
+# Content-addressed cache of synthesized audio (and optionally Tacotron2 mels).
+#
+# - Key: hash of (kind, normalized text, phonemizer version, TTS checkpoint
+#   hash, vocoder checkpoint hash, audio configs, inference mode), so
+#   retraining, swapping the vocoder, changing the G2P or switching between
+#   fp32 and int8 never serves stale audio.
+# - Tiers: an in-memory LRU bounded by bytes in front of a size-bounded disk
+#   tier (<root>/<xx>/<key>.npz, written atomically). Disk entries are
+#   touched on every hit and the least recently used go first on eviction.
+# - Every entry remembers how long it took to compute, so stats() can report
+#   the synthesis time the cache has saved.
+#
+# Root directory: AudioCache(root) or $SINHALA_AUDIO_CACHE (default
+# "audio_cache/"). Used by StreamingSynthesizer(audio_cache=...) and
+# cached_tts().
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from phoneme_cache import normalize_for_key
+
+CACHE_DIR_ENV = "SINHALA_AUDIO_CACHE"
+DEFAULT_CACHE_DIR = "audio_cache"
+EVICT_TARGET = 0.8
+
+_fingerprints: Dict[Tuple[str, int, int], str] = {}
+
+
+def file_fingerprint(path: Optional[str]) -> str:
+    """Content hash of a checkpoint file (memoized per path, size and mtime)."""
+    if not path:
+        return "none"
+    st = os.stat(path)
+    memo_key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    if memo_key not in _fingerprints:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        _fingerprints[memo_key] = h.hexdigest()[:16]
+    return _fingerprints[memo_key]
+
+
+def synthesizer_fingerprint(synthesizer) -> str:
+    """Checkpoint hashes, audio configs and inference mode of a Coqui Synthesizer's TTS model and vocoder."""
+    vocoder_config = getattr(synthesizer, "vocoder_config", None)
+    parts = {
+        "tts": file_fingerprint(getattr(synthesizer, "tts_checkpoint", None)),
+        "vocoder": file_fingerprint(getattr(synthesizer, "vocoder_checkpoint", None)),
+        "tts_audio": dict(synthesizer.tts_config.audio),
+        "vocoder_audio": dict(vocoder_config["audio"]) if vocoder_config else None,
+        "sample_rate": synthesizer.output_sample_rate,
+        # Set by quantized_inference.apply_mode()
+        "mode": getattr(synthesizer, "inference_mode", "fp32"),
+    }
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def audio_key(text: str, phonemizer_version: str, model_fingerprint: str, kind: str = "wav") -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for part in (kind, phonemizer_version, model_fingerprint, normalize_for_key(text)):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class AudioCache:
+    """Two-tier (memory LRU + disk) cache of float32 arrays keyed by audio_key()."""
+
+    def __init__(self, root: Optional[str] = None, max_memory_bytes: int = 256 * 1024 * 1024,
+                 max_disk_bytes: int = 4 * 1024 * 1024 * 1024):
+        self.root = root or os.environ.get(CACHE_DIR_ENV) or DEFAULT_CACHE_DIR
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        os.makedirs(self.root, exist_ok=True)
+        # key -> (array, seconds it took to compute)
+        self._memory: "OrderedDict[str, Tuple[np.ndarray, float]]" = OrderedDict()
+        self.memory_bytes = 0
+        self.disk_bytes = self._scan_disk_bytes()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key + ".npz")
+
+    def _scan_disk_bytes(self) -> int:
+        total = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if name.endswith(".npz"):
+                    total += os.path.getsize(os.path.join(dirpath, name))
+        return total
+
+    # -------------------------
+    # Memory tier
+    # -------------------------
+    def _remember(self, key: str, array: np.ndarray, seconds: float) -> None:
+        if array.nbytes > self.max_memory_bytes:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self.memory_bytes -= old[0].nbytes
+            self._memory[key] = (array, seconds)
+            self.memory_bytes += array.nbytes
+            while self.memory_bytes > self.max_memory_bytes:
+                _, (evicted, _) = self._memory.popitem(last=False)
+                self.memory_bytes -= evicted.nbytes
+
+    # -------------------------
+    # Public API
+    # -------------------------
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                self.seconds_saved += entry[1]
+                return entry[0]
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                array, seconds = data["array"], float(data["seconds"])
+            os.utime(path)
+        except (FileNotFoundError, OSError, ValueError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.disk_hits += 1
+            self.seconds_saved += seconds
+        self._remember(key, array, seconds)
+        return array
+
+    def put(self, key: str, array: np.ndarray, seconds: float = 0.0) -> None:
+        array = np.ascontiguousarray(array, dtype=np.float32)
+        self._remember(key, array, seconds)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, array=array, seconds=np.float64(seconds))
+        size = os.path.getsize(tmp_path)
+        with self._lock:
+            # Overwriting an entry replaces its bytes rather than adding to them
+            try:
+                old_size = os.path.getsize(path)
+            except FileNotFoundError:
+                old_size = 0
+            os.replace(tmp_path, path)
+            self.disk_bytes += size - old_size
+            full = self.disk_bytes > self.max_disk_bytes
+        if full:
+            self.evict()
+
+    def get_or_compute(self, key: str, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        array = self.get(key)
+        if array is None:
+            start = time.perf_counter()
+            array = compute()
+            self.put(key, array, time.perf_counter() - start)
+        return array
+
+    def evict(self, max_disk_bytes: Optional[int] = None) -> int:
+        """Delete least recently used disk entries until under EVICT_TARGET of the limit; returns bytes freed."""
+        limit = self.max_disk_bytes if max_disk_bytes is None else max_disk_bytes
+        entries = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if name.endswith(".npz"):
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        freed = 0
+        if total > limit:
+            entries.sort()
+            for _, size, path in entries:
+                if total - freed <= EVICT_TARGET * limit:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                freed += size
+        with self._lock:
+            self.disk_bytes = total - freed
+        return freed
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self.memory_bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_bytes": self.memory_bytes,
+            "memory_entries": len(self._memory),
+            "disk_bytes": self.disk_bytes,
+            "seconds_saved": self.seconds_saved,
+        }
+
+
+def cached_tts(synthesizer, text: str, cache: AudioCache, phonemizer_version: str = "none") -> np.ndarray:
+    """Synthesizer.tts(text) through the cache (the text is passed to the model as is)."""
+    key = audio_key(text, phonemizer_version, synthesizer_fingerprint(synthesizer))
+    return cache.get_or_compute(key, lambda: np.asarray(synthesizer.tts(text), dtype=np.float32))
+
+
+if __name__ == "__main__":
+    cache = AudioCache()
+    key = audio_key("ආයුබෝවන්", "none", "demo")
+    wav = cache.get_or_compute(key, lambda: (time.sleep(1.0), np.zeros(22050, np.float32))[1])
+    start = time.perf_counter()
+    cache.clear_memory()
+    cache.get(key)
+    print(f"disk hit in {1000 * (time.perf_counter() - start):.2f} ms; {cache.stats()}")
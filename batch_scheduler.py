@@ -0,0 +1,348 @@
+# batch_scheduler.py
+# In-process dynamic batching for Tacotron2 + vocoder inference.
+#
+# Callers submit() sentences from any thread and get a Future back. A single
+# scheduler thread collects pending requests until the batch is full or the
+# oldest request has waited `max_wait` seconds, then batches the oldest
+# request with the pending ones closest to it in token length (within
+# `length_ratio`), so little compute is spent on padding. The rest stay queued
+# for the next batch. Text with no model input symbols is rejected by
+# submit(), and a failed batch is retried item by item, so an error reaches
+# only the request that caused it.
+#
+# A batch runs as:
+#   - padded Tacotron2 encoding: padding is re-zeroed after every encoder
+#     conv (as the conv zero padding of a batch-1 run), the LSTM is packed by
+#     length and attention is masked to each item's own tokens;
+#   - one decoder loop for the whole batch with per-item stop handling: an
+#     item's length is fixed at its first stop token, and the loop ends once
+#     every item has stopped;
+#   - postnet on the batch, again re-zeroing each item's frames past its stop
+#     after every conv;
+#   - one batched vocoder call on the mels padded with silence, cut back to
+#     each item's own frames. This step is not equivalent to batch size 1:
+#     the generator's inference padding is dropped instead of kept, and near
+#     the end of a shorter item the vocoder's receptive field reaches into
+#     the silence padding, so those samples differ.
+#
+# Models the batched decoder does not support (multi-speaker, GST) fall back
+# to one-by-one Synthesizer.tts calls.
+#
+# benchmark() reports throughput and latency percentiles for several
+# (max_batch_size, max_wait) settings under concurrent load.
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from streaming_tts import model_lock
+
+
+class _Request(NamedTuple):
+    text: str
+    ids: List[int]
+    future: Future
+    submitted: float
+
+
+class BatchScheduler:
+    """Dynamic batching front for a Coqui Synthesizer (Tacotron2 + vocoder)."""
+
+    def __init__(self, synthesizer, max_batch_size: int = 8, max_wait: float = 0.01,
+                 length_ratio: float = 1.5):
+        self.synthesizer = synthesizer
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.length_ratio = length_ratio
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._pending: List[_Request] = []
+        self.reset_stats()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    # -------------------------
+    # Public API
+    # -------------------------
+    def submit(self, text: str) -> Future:
+        """Queue one sentence of model input text; the Future resolves to its float32 waveform."""
+        future: Future = Future()
+        try:
+            ids = self.synthesizer.tts_model.tokenizer.text_to_ids(text)
+        except BaseException as e:
+            future.set_exception(e)
+            return future
+        if not ids:
+            # Only punctuation or unsupported characters: nothing to decode
+            future.set_exception(ValueError(f"No model input symbols in {text!r}"))
+            return future
+        self._queue.put(_Request(text, ids, future, time.perf_counter()))
+        return future
+
+    def synthesize(self, text: str) -> np.ndarray:
+        return self.submit(text).result()
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    def reset_stats(self) -> None:
+        self.latencies: List[float] = []
+        self.batch_sizes: List[int] = []
+        self.audio_seconds = 0.0
+        self._started = time.perf_counter()
+
+    def stats(self) -> dict:
+        elapsed = time.perf_counter() - self._started
+        lat = np.asarray(self.latencies) if self.latencies else np.zeros(1)
+        return {
+            "requests": len(self.latencies),
+            "batches": len(self.batch_sizes),
+            "mean_batch_size": float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.0,
+            "requests_per_s": len(self.latencies) / elapsed if elapsed else 0.0,
+            "audio_s_per_s": self.audio_seconds / elapsed if elapsed else 0.0,
+            "latency_p50": float(np.percentile(lat, 50)),
+            "latency_p90": float(np.percentile(lat, 90)),
+            "latency_p99": float(np.percentile(lat, 99)),
+        }
+
+    # -------------------------
+    # Scheduling
+    # -------------------------
+    def _collect(self) -> bool:
+        """Fill the pending list until a batch is due; False once close() was called."""
+        if not self._pending:
+            request = self._queue.get()
+            if request is None:
+                return False
+            self._pending.append(request)
+        deadline = self._pending[0].submitted + self.max_wait
+        while len(self._pending) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                self._queue.put(None)
+                break
+            self._pending.append(request)
+        return True
+
+    def _pick_batch(self) -> List[_Request]:
+        """Oldest request plus the pending ones nearest to it in length."""
+        anchor = len(self._pending[0].ids)
+        lo, hi = anchor / self.length_ratio, anchor * self.length_ratio
+        candidates = [r for r in self._pending[1:] if lo <= len(r.ids) <= hi]
+        candidates.sort(key=lambda r: abs(len(r.ids) - anchor))
+        batch = [self._pending[0]] + candidates[:self.max_batch_size - 1]
+        chosen = {id(r) for r in batch}
+        self._pending = [r for r in self._pending if id(r) not in chosen]
+        return batch
+
+    def _run(self, batch: List[_Request]) -> None:
+        """Run a batch and resolve its futures; a failed batch is retried item by item."""
+        try:
+            wavs = self.run_batch([r.text for r in batch], [r.ids for r in batch])
+        except BaseException as e:
+            if len(batch) == 1:
+                batch[0].future.set_exception(e)
+                return
+            # Only the request that caused the failure gets the error
+            for r in batch:
+                self._run([r])
+            return
+        now = time.perf_counter()
+        self.batch_sizes.append(len(batch))
+        for r, wav in zip(batch, wavs):
+            self.latencies.append(now - r.submitted)
+            self.audio_seconds += len(wav) / self.synthesizer.output_sample_rate
+            r.future.set_result(wav)
+
+    def _loop(self) -> None:
+        while self._collect():
+            self._run(self._pick_batch())
+        # Drain whatever is still pending after close()
+        for r in self._pending:
+            r.future.cancel()
+
+    # -------------------------
+    # Batched inference
+    # -------------------------
+    def run_batch(self, texts: Sequence[str], batch_ids: Sequence[List[int]]) -> List[np.ndarray]:
+        """Waveforms for a batch of texts and their token ID sequences."""
+        model = self.synthesizer.tts_model
+        if getattr(model, "num_speakers", 1) > 1 or getattr(model, "use_gst", False):
+            return [np.asarray(self.synthesizer.tts(text), dtype=np.float32) for text in texts]
+        mels = self.decode_batch(batch_ids)
+        return self.vocode_batch(mels)
+
+    def decode_batch(self, batch_ids: Sequence[List[int]]) -> List[np.ndarray]:
+        """Padded batched Tacotron2 decoding; returns each item's denormalized mel (frames x bins)."""
+        import torch
+
+        synth = self.synthesizer
+        model = synth.tts_model
+        decoder = model.decoder
+        device = "cuda" if synth.use_cuda else "cpu"
+
+        lengths = torch.tensor([len(ids) for ids in batch_ids], dtype=torch.long)
+        tokens = torch.zeros(len(batch_ids), int(lengths.max()), dtype=torch.long)
+        for i, ids in enumerate(batch_ids):
+            tokens[i, :len(ids)] = torch.tensor(ids, dtype=torch.long)
+        tokens, lengths = tokens.to(device), lengths.to(device)
+        mask = torch.arange(tokens.shape[1], device=device)[None, :] < lengths[:, None]
+
+        with model_lock(model), torch.no_grad():
+            # Encoder.forward(), keeping the padding at zero between the convs
+            x = model.embedding(tokens).transpose(1, 2) * mask[:, None, :]
+            for layer in model.encoder.convolutions:
+                x = layer(x) * mask[:, None, :]
+            x = torch.nn.utils.rnn.pack_padded_sequence(
+                x.transpose(1, 2), lengths.cpu(), batch_first=True, enforce_sorted=False)
+            model.encoder.lstm.flatten_parameters()
+            encoder_outputs, _ = model.encoder.lstm(x)
+            encoder_outputs, _ = torch.nn.utils.rnn.pad_packed_sequence(encoder_outputs, batch_first=True)
+
+            # Decoder.inference() for a batch, stopping each item on its own
+            memory = decoder._update_memory(decoder.get_go_frame(encoder_outputs))
+            decoder._init_states(encoder_outputs, mask=mask)
+            decoder.attention.init_states(encoder_outputs)
+            outputs, stop_tokens, alignments = [], [], []
+            steps = torch.zeros(len(batch_ids), dtype=torch.long, device=device)
+            done = torch.zeros(len(batch_ids), dtype=torch.bool, device=device)
+            t = 0
+            while True:
+                memory = decoder.prenet(memory)
+                decoder_output, alignment, stop_token = decoder.decode(memory)
+                stop_token = torch.sigmoid(stop_token.data).reshape(-1)
+                outputs.append(decoder_output.squeeze(1))
+                stop_tokens.append(stop_token)
+                alignments.append(alignment)
+                t += 1
+                # Same rule as Decoder.inference at batch size 1: stop after the first step
+                newly_done = ~done & (stop_token > decoder.stop_threshold) & (t > 1)
+                steps[newly_done] = t
+                done |= newly_done
+                if bool(done.all()):
+                    break
+                if t == decoder.max_decoder_steps:
+                    print("   > Decoder stopped with `max_decoder_steps` {}".format(decoder.max_decoder_steps))
+                    steps[~done] = t
+                    break
+                memory = decoder._update_memory(decoder_output)
+            decoder_outputs, _, _ = decoder._parse_outputs(outputs, stop_tokens, alignments)
+
+            # Postnet with every item's frames past its stop held at zero
+            frames = steps * decoder.r
+            frame_mask = (torch.arange(decoder_outputs.shape[2], device=device)[None, :] < frames[:, None])[:, None, :]
+            decoder_outputs = decoder_outputs * frame_mask
+            x = decoder_outputs
+            for layer in model.postnet.convolutions:
+                x = layer(x) * frame_mask
+            postnet_outputs = decoder_outputs + x
+
+        mels = []
+        for i, n in enumerate(frames.tolist()):
+            mel = postnet_outputs[i, :, :n].cpu().numpy().T
+            mels.append(model.ap.denormalize(mel.T).T)
+        return mels
+
+    def vocode_batch(self, mels: Sequence[np.ndarray]) -> List[np.ndarray]:
+        """
+        One vocoder call for all mels (padded with silence), cut to each
+        item's own frames: inference padding and batch padding are dropped,
+        and the last samples of shorter items are only approximate.
+        """
+        import torch
+        from TTS.tts.utils.synthesis import trim_silence
+        from TTS.vocoder.utils.generic_utils import interpolate_vocoder_input
+
+        synth = self.synthesizer
+        if synth.vocoder_model is None:
+            wavs = [synth.tts_model.ap.inv_melspectrogram(synth.tts_model.ap.normalize(mel.T)) for mel in mels]
+        else:
+            scale = synth.vocoder_config["audio"]["sample_rate"] / synth.tts_model.ap.sample_rate
+            inputs = []
+            for mel in mels:
+                x = synth.vocoder_ap.normalize(mel.T)
+                if scale != 1:
+                    x = interpolate_vocoder_input([1, scale], x).squeeze(0).numpy()
+                inputs.append(np.asarray(x, dtype=np.float32))
+            n_frames = [x.shape[1] for x in inputs]
+            batch = np.stack([
+                np.pad(x, ((0, 0), (0, max(n_frames) - x.shape[1])), constant_values=x.min())
+                for x in inputs
+            ])
+            device = "cuda" if synth.use_cuda else "cpu"
+            with torch.no_grad():
+                out = synth.vocoder_model.inference(torch.from_numpy(batch).to(device))
+            out = out.reshape(len(inputs), -1).cpu().numpy()
+            # inference() pads the input by inference_padding frames on each side
+            generator = getattr(synth.vocoder_model, "model_g", synth.vocoder_model)
+            pad = getattr(generator, "inference_padding", 0)
+            hop = synth.vocoder_ap.hop_length
+            wavs = [out[i, pad * hop:(pad + n) * hop] for i, n in enumerate(n_frames)]
+
+        if synth.tts_config.audio.get("do_trim_silence", False):
+            wavs = [trim_silence(wav, synth.tts_model.ap) for wav in wavs]
+        return [np.asarray(wav, dtype=np.float32) for wav in wavs]
+
+
+def benchmark(synthesizer, texts: Sequence[str],
+              settings: Sequence[Tuple[int, float]] = ((1, 0.0), (4, 0.01), (8, 0.02), (16, 0.05)),
+              concurrency: int = 16) -> List[dict]:
+    """
+    Replay `texts` from `concurrency` client threads against a scheduler for
+    every (max_batch_size, max_wait) setting and print throughput and latency
+    percentiles.
+    """
+    results = []
+    for max_batch_size, max_wait in settings:
+        scheduler = BatchScheduler(synthesizer, max_batch_size=max_batch_size, max_wait=max_wait)
+        # Warm-up, excluded from the numbers
+        scheduler.synthesize(texts[0])
+        scheduler.reset_stats()
+
+        def client(offset: int) -> None:
+            for text in texts[offset::concurrency]:
+                scheduler.synthesize(text)
+
+        clients = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+        for c in clients:
+            c.start()
+        for c in clients:
+            c.join()
+        stats = scheduler.stats()
+        scheduler.close()
+        stats.update(max_batch_size=max_batch_size, max_wait=max_wait)
+        results.append(stats)
+        print(f"batch≤{max_batch_size:<3} wait {max_wait * 1000:5.1f}ms | "
+              f"{stats['requests_per_s']:6.2f} req/s {stats['audio_s_per_s']:6.2f} audio-s/s | "
+              f"mean batch {stats['mean_batch_size']:4.1f} | "
+              f"p50 {stats['latency_p50']:.3f}s p90 {stats['latency_p90']:.3f}s p99 {stats['latency_p99']:.3f}s")
+    return results
+
+
+if __name__ == "__main__":
+    from TTS.utils.synthesizer import Synthesizer
+
+    from streaming_tts import split_sentences
+
+    tts_model_path = "output/tacotron2-DDC-sinhala/checkpoint.pth"
+    tts_config_path = "output/tacotron2-DDC-sinhala/config.json"
+    vocoder_model_path = "output/hifigan/model_file.pth"
+    vocoder_config_path = "output/hifigan/config.json"
+
+    synthesizer = Synthesizer(
+        tts_checkpoint=tts_model_path,
+        tts_config_path=tts_config_path,
+        vocoder_checkpoint=vocoder_model_path,
+        vocoder_config=vocoder_config_path,
+    )
+    text = "ɡowi dʒɐnətaːwəɡeː, dʰiːwəɹə dʒɐnətaːwəɡeː, wɐtu kɐmkəɹuwaːɡeː meː sijəlu ɡ ɹaːmiːjə dʒɐnətaːwəɡeː ɡæʈəlu sɐməɡə kɐʈəjutu kɐɹənəwaː."
+    sentences = split_sentences(text, max_chars=40) * 16
+    benchmark(synthesizer, sentences)
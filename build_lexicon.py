@@ -0,0 +1,70 @@
+# build_lexicon.py
+# Compile word -> IPA pronunciation lists into a read-only marisa-trie that
+# g2p.load_lexicon() memory-maps and consults before the G2P rules.
+#
+# Input lists are UTF-8 TSV files with one "word<TAB>ipa" pair per line
+# (blank lines and lines starting with "#" are ignored). Later files win, so
+# pass the precomputed frequent-word dump first and the hand-corrected
+# exceptions last.
+#
+# Typical flow:
+#   dump_frequent_words("corpus.txt", "frequent.tsv", top_n=200_000)
+#   build_lexicon(["frequent.tsv", "exceptions.tsv"], "lexicon.marisa")
+#   g2p.load_lexicon("lexicon.marisa")
+
+import re
+from collections import Counter
+from typing import Dict, Iterable, Tuple
+
+import marisa_trie
+
+import g2p
+
+
+def read_pronunciations(path: str) -> Iterable[Tuple[str, str]]:
+    """Yield (NFC word, ipa) pairs from a word<TAB>ipa file."""
+    with open(path, "r", encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.rstrip("\r\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            try:
+                word, ipa = line.split("\t", 1)
+            except ValueError:
+                raise ValueError(f"{path}:{lineno}: expected 'word<TAB>ipa'") from None
+            yield g2p.normalize_text(word.strip()), ipa.strip()
+
+
+def build_lexicon(input_paths: Iterable[str], output_path: str) -> int:
+    """Merge the pronunciation lists (later files override earlier ones) and save the trie."""
+    entries: Dict[str, str] = {}
+    for path in input_paths:
+        for word, ipa in read_pronunciations(path):
+            entries[word] = ipa
+
+    trie = marisa_trie.BytesTrie((word, ipa.encode("utf-8")) for word, ipa in entries.items())
+    trie.save(output_path)
+    print(f"[✓] Built lexicon with {len(entries)} entries → {output_path}")
+    return len(entries)
+
+
+def dump_frequent_words(corpus_path: str, output_path: str, top_n: int = 100_000) -> int:
+    """Write the rule-based IPA of the `top_n` most frequent corpus words as a TSV."""
+    counts: Counter = Counter()
+    with open(corpus_path, "r", encoding="utf-8") as f:
+        for line in f:
+            counts.update(re.findall(r"\S+", g2p.normalize_text(line)))
+
+    # Make sure the dump reflects the rules, not a previously loaded lexicon
+    g2p.unload_lexicon()
+    with open(output_path, "w", encoding="utf-8") as f:
+        for word, _ in counts.most_common(top_n):
+            f.write(f"{word}\t{g2p.sinhala_to_ipa(word)}\n")
+    print(f"[✓] Dumped {min(top_n, len(counts))} frequent words → {output_path}")
+    return min(top_n, len(counts))
+
+
+if __name__ == "__main__":
+    # Example usage
+    # dump_frequent_words("input.txt", "frequent_words.tsv", top_n=100_000)
+    build_lexicon(["frequent_words.tsv", "lexicon_exceptions.tsv"], "lexicon.marisa")
@@ -0,0 +1,124 @@
+# chunked_vocoder.py
+# HiFi-GAN vocoding of long mel spectrograms in fixed-size windows (meant for
+# CPU serving; the vocoder runs on whatever device it is already on).
+#
+# The mel is cut into windows of `chunk_frames` frames. Each window is run
+# with `context_frames` of real neighbouring frames on both sides (so the
+# generator's receptive field sees the same input it would in a single pass),
+# the context is trimmed from the output, and neighbouring windows overlap by
+# `overlap_frames` that are linearly crossfaded to hide any residual seam.
+# Coqui generators' inference() pads its input by `inference_padding` frames
+# on each side ("replicate"); that padding is skipped when the window's
+# output is sliced, so windows line up sample-exactly with a single pass.
+#
+# Peak memory depends only on the window size, not on the utterance length,
+# and iter_vocode() yields every chunk as soon as it is ready.
+#
+# Usage:
+#   vocoder = ChunkedVocoder(torch.jit.load("hifigan.pt", map_location="cpu"), hop_length=256)
+#   for chunk in vocoder.iter_vocode(mel):   # mel: (n_mels, frames), vocoder-normalized
+#       play(chunk)
+
+from typing import Iterator
+
+import numpy as np
+
+
+class ChunkedVocoder:
+    """Windowed, overlap-add wrapper around a mel -> waveform vocoder."""
+
+    def __init__(self, vocoder, hop_length: int, chunk_frames: int = 100,
+                 context_frames: int = 16, overlap_frames: int = 4):
+        """
+        `vocoder` is a Coqui vocoder model (uses .inference) or any module
+        mapping a (1, n_mels, frames) tensor to (1, 1, frames * hop_length)
+        samples, e.g. a TorchScript HiFi-GAN. It is used where it is, never
+        moved: the vocoder of a shared Synthesizer must keep its device.
+        """
+        if overlap_frames > context_frames:
+            raise ValueError("overlap_frames must not exceed context_frames")
+        if chunk_frames <= overlap_frames:
+            raise ValueError("chunk_frames must be larger than overlap_frames")
+        if hasattr(vocoder, "eval"):
+            vocoder.eval()
+        self.vocoder = vocoder
+        parameter = next(vocoder.parameters(), None) if hasattr(vocoder, "parameters") else None
+        self.device = parameter.device if parameter is not None else "cpu"
+        # Frames inference() adds on each side (Coqui GAN wrapper -> its generator)
+        generator = getattr(vocoder, "model_g", vocoder)
+        self.inference_padding = getattr(generator, "inference_padding", 0) if hasattr(vocoder, "inference") else 0
+        self.hop_length = hop_length
+        self.chunk_frames = chunk_frames
+        self.context_frames = context_frames
+        self.overlap_frames = overlap_frames
+        n = overlap_frames * hop_length
+        self._fade_in = np.linspace(0.0, 1.0, n + 2, dtype=np.float32)[1:-1]
+        self._fade_out = 1.0 - self._fade_in
+
+    def _run(self, mel: np.ndarray) -> np.ndarray:
+        import torch
+
+        x = torch.from_numpy(np.ascontiguousarray(mel, dtype=np.float32)).unsqueeze(0).to(self.device)
+        with torch.no_grad():
+            if hasattr(self.vocoder, "inference"):
+                wav = self.vocoder.inference(x)
+            else:
+                wav = self.vocoder(x)
+        return wav.reshape(-1).cpu().numpy()
+
+    def iter_vocode(self, mel) -> Iterator[np.ndarray]:
+        """Yield float32 waveform chunks for `mel` (n_mels x frames), in order."""
+        mel = np.asarray(mel, dtype=np.float32)
+        total = mel.shape[1]
+        hop, ctx, ov = self.hop_length, self.context_frames, self.overlap_frames
+        pad = self.inference_padding
+        tail = None
+        for start in range(0, total, self.chunk_frames):
+            end = min(start + self.chunk_frames, total)
+            last = end == total
+            # This window produces frames [start, out_end): its core plus the
+            # overlap that the next window crossfades into
+            out_end = end if last else min(end + ov, total)
+            in_start = max(0, start - ctx)
+            in_end = min(total, out_end + ctx)
+            wav = self._run(mel[:, in_start:in_end])
+            wav = wav[(pad + start - in_start) * hop:(pad + out_end - in_start) * hop]
+
+            if tail is not None:
+                n = len(tail)
+                wav = wav.copy()
+                wav[:n] = tail * self._fade_out[:n] + wav[:n] * self._fade_in[:n]
+            if last:
+                yield wav
+                return
+            # Hold back the overlap until the next window has produced it too
+            keep = (out_end - end) * hop
+            tail = wav[len(wav) - keep:] if keep else None
+            yield wav[:len(wav) - keep]
+
+    def vocode(self, mel) -> np.ndarray:
+        """Whole waveform for `mel`, computed window by window."""
+        chunks = list(self.iter_vocode(mel))
+        return np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32)
+
+
+if __name__ == "__main__":
+    # Seam check against a single inference() pass of a (randomly initialized)
+    # Coqui HiFi-GAN generator, inference padding included
+    import torch
+    from TTS.vocoder.models.hifigan_generator import HifiganGenerator
+
+    torch.manual_seed(0)
+    generator = HifiganGenerator(80, 1, resblock_type="1", resblock_dilation_sizes=[[1, 3, 5]] * 3,
+                                 resblock_kernel_sizes=[3, 7, 11], upsample_kernel_sizes=[16, 16, 4, 4],
+                                 upsample_initial_channel=128, upsample_factors=[8, 8, 2, 2],
+                                 inference_padding=5).eval()
+    generator.remove_weight_norm()
+    hop = 256
+    mel = np.random.default_rng(0).standard_normal((80, 400)).astype(np.float32)
+    with torch.no_grad():
+        full = generator.inference(torch.from_numpy(mel).unsqueeze(0)).reshape(-1).numpy()
+    full = full[generator.inference_padding * hop:len(full) - generator.inference_padding * hop]
+    chunked = ChunkedVocoder(generator, hop_length=hop, chunk_frames=64).vocode(mel)
+    assert len(chunked) == len(full), (len(chunked), len(full))
+    print(f"[✓] {len(chunked)} samples, max abs diff vs single pass {np.abs(full - chunked).max():.2e}")
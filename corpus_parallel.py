@@ -0,0 +1,154 @@
+# corpus_parallel.py
+# Run a per-shard conversion function over a large corpus on a process pool.
+#
+# - The input is cut into shards (line-aligned for text files, row-aligned
+#   for metadata CSVs) and every shard is converted in a worker process.
+# - Results are written back strictly in input order, whatever order the
+#   workers finish in, and only a bounded number of shards is in flight.
+# - After every written shard (flushed and fsync'ed) a small JSON checkpoint
+#   records how many shards are done and the output size at that point, so
+#   an interrupted run resumes from the last completed shard instead of
+#   starting from zero. The input file's size and mtime are part of the job,
+#   so an edited input starts over instead of mixing old and new shards.
+#
+# With workers=0 the shards are converted one by one in the calling process
+# (same ordered output and checkpointing, no pool).
+#
+# Used by g2p.convert_file_parallel(), text_phonemizer.convert_file() and
+# text_phonemizer.convert_file_parallel().
+
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+
+def iter_line_shards(path: str, shard_lines: int) -> Iterator[List[str]]:
+    """Yield lists of at most `shard_lines` lines, line endings kept intact."""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        while True:
+            lines = list(islice(f, shard_lines))
+            if not lines:
+                return
+            yield lines
+
+
+def default_checkpoint_path(output_path: str) -> str:
+    return output_path + ".ckpt.json"
+
+
+def _load_checkpoint(checkpoint_path: str, job: dict) -> Optional[dict]:
+    """Checkpoint for this exact job, or None if absent or written for another job."""
+    try:
+        with open(checkpoint_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return state if state.get("job") == job else None
+
+
+def _save_checkpoint(checkpoint_path: str, state: dict) -> None:
+    tmp_path = checkpoint_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, checkpoint_path)
+
+
+def _input_identity(path: str) -> Optional[list]:
+    """[size, mtime_ns] of an input file (a list, as it reads back from JSON)."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def run_sharded(
+    shards: Iterable[Any],
+    worker: Callable[[Any], str],
+    output_path: str,
+    job: dict,
+    workers: Optional[int] = None,
+    checkpoint_path: Optional[str] = None,
+    resume: bool = True,
+    initializer: Optional[Callable] = None,
+    initargs: tuple = (),
+    progress_every: float = 5.0,
+) -> int:
+    """
+    Convert every shard with `worker` (a picklable top-level function returning
+    text) on a process pool and write the results to `output_path` in order.
+
+    `job` describes the run (input path, shard size, options); a checkpoint is
+    only resumed if it was written for an identical job and, when `job` has
+    an "input" path, for the same input size and mtime. `workers` defaults to
+    the CPU count; 0 converts in this process. Returns the number of shards
+    converted by this call.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    checkpoint_path = checkpoint_path or default_checkpoint_path(output_path)
+    if "input" in job:
+        job = dict(job, input_stat=_input_identity(job["input"]))
+
+    state = _load_checkpoint(checkpoint_path, job) if resume else None
+    if state is not None and os.path.exists(output_path):
+        skip = state["shards_done"]
+        out = open(output_path, "r+b")
+        # Drop anything written after the last checkpoint
+        out.truncate(state["output_bytes"])
+        out.seek(0, os.SEEK_END)
+        print(f"Resuming after {skip} completed shards.")
+    else:
+        skip = 0
+        out = open(output_path, "wb")
+        state = {"job": job, "shards_done": 0, "output_bytes": 0}
+
+    done = 0
+    start = last_report = time.perf_counter()
+
+    def write(text: str) -> None:
+        nonlocal done, last_report
+        out.write(text.encode("utf-8"))
+        out.flush()
+        # The data must be on disk before the checkpoint says it is
+        os.fsync(out.fileno())
+        done += 1
+        state["shards_done"] = skip + done
+        state["output_bytes"] = out.tell()
+        _save_checkpoint(checkpoint_path, state)
+        now = time.perf_counter()
+        if now - last_report >= progress_every:
+            last_report = now
+            rate = done / (now - start)
+            print(f"[{skip + done} shards done] {rate:.2f} shards/s")
+
+    with out:
+        if workers == 0:
+            if initializer is not None:
+                initializer(*initargs)
+            for shard in islice(shards, skip, None):
+                write(worker(shard))
+        else:
+            with ProcessPoolExecutor(workers, initializer=initializer, initargs=initargs) as pool:
+                pending: deque = deque()
+                # Keep a couple of shards queued per worker so no core idles, but no more
+                max_pending = 2 * workers
+                for shard in islice(shards, skip, None):
+                    pending.append(pool.submit(worker, shard))
+                    if len(pending) >= max_pending:
+                        write(pending.popleft().result())
+                while pending:
+                    write(pending.popleft().result())
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    elapsed = time.perf_counter() - start
+    where = f"using {workers} workers" if workers else "in-process"
+    print(f"[✓] {done} shards in {elapsed:.1f}s {where} → {output_path}")
+    return done
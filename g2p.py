@@ -1,6 +1,13 @@
+import hashlib
+import os
 import re
+import threading
 import unicodedata
-from typing import List
+from array import array
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterator, List, NamedTuple, Optional, Sequence, TextIO, Tuple
+
+import corpus_parallel
 
 
 ZWJ = "\u200D"      # Zero-width joiner
@@ -63,140 +70,161 @@ CONSONANT_TOKENS = set(CONS_MAP.values())
 VOWEL_TOKENS = set(["a","aː","æ","æː","i","iː","u","uː","e","eː","o","oː","au","ai","ru","ri","ə"])
 
 
-def is_consonant_token(tok: str) -> bool:
-    return tok in CONSONANT_TOKENS
-
-def is_vowel_token(tok: str) -> bool:
-    return tok in VOWEL_TOKENS
-
-def normalize_text(s: str) -> str:
-    return unicodedata.normalize("NFC", s)
-
+# Integer token codes.
+# Every phoneme the scanner can emit gets a small code (its index in PHONEMES).
+# Characters passed through untouched (punctuation, digits, Latin, ...) are
+# encoded as LITERAL_BASE + ord(ch), so a word is always a flat array of ints
+# and multi-character phonemes like "aː" or "nd̪" stay a single token.
+PHONEMES: List[str] = sorted(
+    CONSONANT_TOKENS
+    | VOWEL_TOKENS
+    | set(VOWEL_SIGNS.values())
+    | set(INDEP_VOWELS.values())
+    | set(SPECIAL_SIGNS.values())
+)
+PHONEME_ID = {p: i for i, p in enumerate(PHONEMES)}
+LITERAL_BASE = 0x100
+TOKEN_TYPECODE = "I"
 
-def word_to_initial_phonemes(word: str) -> str:
-    out = []
-    last_vowel_idx = None
-    i = 0
-    L = len(word)
-    print("Processing word:", word, "length:", L)
+CONSONANT_IDS = frozenset(PHONEME_ID[t] for t in CONSONANT_TOKENS)
+VOWEL_IDS = frozenset(PHONEME_ID[t] for t in VOWEL_TOKENS)
 
-    while i < L:
-        ch = word[i]
 
-        # Independent vowels
-        if ch in INDEP_VOWELS:
-            out.append(INDEP_VOWELS[ch])
-            last_vowel_idx = None
-            i += 1
-            continue
+def phoneme_id(tok: str) -> int:
+    """Code for an inventory phoneme, or a literal code for a single character."""
+    code = PHONEME_ID.get(tok)
+    return LITERAL_BASE + ord(tok) if code is None else code
 
-        # Special signs
-        if ch in SPECIAL_SIGNS:
-            out.append(SPECIAL_SIGNS[ch])
-            last_vowel_idx = None
-            i += 1
-            continue
 
-        # --- Repaya check (ර් + consonant) ---
-        if (
-            i + 1 < L
-            and ch == "ර"
-            and word[i+1] == VIRAMA 
-            and i + 2 < L
-            and word[i+2] in CONS_MAP
-        ):
-            # Add leading "r"
-            out.append("r")
-            # Process the following consonant normally
-            ch = word[i+2]
-            out.append(CONS_MAP[ch])
-            out.append("ə")  # default schwa
-            last_vowel_idx = len(out) - 1
-            j = i + 3
-
-            # Check for dependent vowels after repaya cluster
-            while j < L and word[j] in VOWEL_SIGNS:
-                out[last_vowel_idx] = VOWEL_SIGNS[word[j]]
-                j += 1
-
-            # Virama cancels schwa
-            if j < L and word[j] == VIRAMA:
-                if last_vowel_idx is not None and last_vowel_idx == len(out) - 1:
-                    out.pop()
-                    last_vowel_idx = None
-                j += 1
-
-            i = j
-            continue
+def new_tokens(codes=()) -> array:
+    return array(TOKEN_TYPECODE, codes)
 
-        # --- Consonants (normal flow) ---
-        if ch in CONS_MAP:
-            base = CONS_MAP[ch]
-            out.append(base)
-            out.append("ə")  # schwa
-            last_vowel_idx = len(out) - 1
-            print(out)
-            j = i + 1
-
-            if j < L and word[j] == ZWJ: j+=1  # skip ZWJ if present
-
-            # Handle rakaransaya / yansaya
-            if (
-                j + 2 < L
-                and word[j] == VIRAMA
-                and word[j+1] == ZWJ
-                and word[j+2] in ("ර", "ය")
-            ):
-                if last_vowel_idx is not None and last_vowel_idx == len(out) - 1:
-                    out.pop()
-                    last_vowel_idx = None
-                out.append("r" if word[j+2] == "ර" else "j")
-                j += 3
-                if j < L and word[j] in VOWEL_SIGNS:
-                    out.append(VOWEL_SIGNS[word[j]])
-                    j += 1
-                i = j
-                continue
 
-            # Normal dependent vowels
-            while j < L and word[j] in VOWEL_SIGNS:
-                out[last_vowel_idx] = VOWEL_SIGNS[word[j]]
-                j += 1
+# Codes the rules refer to by name
+SCHWA = PHONEME_ID["ə"]
+_A, _AA, _E, _EE, _AE, _O, _OO = (PHONEME_ID[t] for t in ("a", "aː", "e", "eː", "æ", "o", "oː"))
+_I, _U = PHONEME_ID["i"], PHONEME_ID["u"]
+_K, _R, _L, _J, _H, _S = (PHONEME_ID[t] for t in ("k", "r", "l", "j", "h", "s"))
+_B, _RETRO_D, _RETRO_T = PHONEME_ID["b"], PHONEME_ID["ɖ"], PHONEME_ID["ʈ"]
+_SV_V = phoneme_id("ʋ")
+_RULE3_LEFT = frozenset((_A, _E, _AE, _O, SCHWA))
+_LIQUIDS = frozenset((_R, _L))
+_RULE5_EXCEPT = frozenset((_R, _B, _RETRO_D, _RETRO_T))
+_KAL_A = frozenset((_A, _AA))
+_LONG_VOWELS = frozenset((_AA, _EE, _OO))
 
-            # Virama cancels schwa
-            if j < L and word[j] == VIRAMA:
-                if last_vowel_idx is not None and last_vowel_idx == len(out) - 1:
-                    out.pop()
-                    last_vowel_idx = None
-                j += 1
 
-            i = j
-            continue
+def is_consonant_token(tok: int) -> bool:
+    return tok in CONSONANT_IDS
 
-        # Dependent vowel by itself
-        if ch in VOWEL_SIGNS:
-            out.append(VOWEL_SIGNS[ch])
-            last_vowel_idx = None
-            i += 1
-            continue
+def is_vowel_token(tok: int) -> bool:
+    return tok in VOWEL_IDS
 
-        # Virama alone
-        if ch == VIRAMA:
-            if last_vowel_idx is not None and last_vowel_idx == len(out) - 1:
-                out.pop()
-                last_vowel_idx = None
-            i += 1
-            continue
-
-        # Other characters (punctuation, whitespace, etc.)
-        out.append(ch)
-        last_vowel_idx = None
-        i += 1
-
-    return "".join(out)
+def normalize_text(s: str) -> str:
+    return unicodedata.normalize("NFC", s)
 
 
-def rule1_initial_schwa_to_a(tokens: List[str]) -> bool:
+# Grapheme -> phoneme code tables used by the scanner
+_INDEP_CODES = {ch: PHONEME_ID[p] for ch, p in INDEP_VOWELS.items()}
+_SPECIAL_CODES = {ch: PHONEME_ID[p] for ch, p in SPECIAL_SIGNS.items()}
+_CONS_CODES = {ch: PHONEME_ID[p] for ch, p in CONS_MAP.items()}
+_VOWEL_SIGN_CODES = {ch: PHONEME_ID[p] for ch, p in VOWEL_SIGNS.items()}
+
+
+# -------------------------
+# Grapheme-cluster scanner
+# -------------------------
+# A word is split into grapheme clusters by one precompiled regex (ordered
+# alternation, so repaya wins over a plain consonant and rakaransaya/yansaya
+# over a virama). Each cluster maps to a fixed tuple of phoneme codes that
+# only depends on the cluster text, so the codes are looked up in a table
+# that is pre-filled at import for every common cluster.
+def _char_class(chars) -> str:
+    return "[" + "".join(re.escape(c) for c in chars) + "]"
+
+_CONS_RX = _char_class(CONS_MAP)
+_VS_RX = _char_class(VOWEL_SIGNS)
+_CLUSTER_PATTERN = (
+    # repaya: ර් + consonant, dependent vowels, optional virama
+    f"(?P<repaya>ර{VIRAMA}(?P<rc>{_CONS_RX})(?P<rv>{_VS_RX}*)(?P<rk>{VIRAMA})?)"
+    # consonant, optional ZWJ, then rakaransaya/yansaya or vowels + virama
+    f"|(?P<cons>(?P<cc>{_CONS_RX}){ZWJ}?(?:{VIRAMA}{ZWJ}(?P<ry>[රය])(?P<ryv>{_VS_RX})?"
+    f"|(?P<cv>{_VS_RX}*)(?P<ck>{VIRAMA})?))"
+    f"|(?P<iv>{_char_class(INDEP_VOWELS)})"
+    f"|(?P<sp>{_char_class(SPECIAL_SIGNS)})"
+    f"|(?P<vs>{_VS_RX})"
+    f"|(?P<virama>{VIRAMA})"
+    f"|(?P<lit>.)"
+)
+_CLUSTER_RE = re.compile(_CLUSTER_PATTERN, re.DOTALL)
+# Same automaton without capture groups, for the hot splitting path
+_SPLIT_RE = re.compile(re.sub(r"\(\?P<\w+>", "(?:", _CLUSTER_PATTERN), re.DOTALL)
+
+# Clusters longer than this (stacked vowel signs etc.) are decoded but not memoized
+_MAX_TABLE_CLUSTER = 6
+
+
+def _cluster_codes(cluster: str) -> tuple:
+    """Phoneme codes for a single grapheme cluster."""
+    m = _CLUSTER_RE.fullmatch(cluster)
+    kind = m.lastgroup
+    if kind == "repaya":
+        if m.group("rk"):
+            return (_R, _CONS_CODES[m.group("rc")])
+        rv = m.group("rv")
+        vowel = _VOWEL_SIGN_CODES[rv[-1]] if rv else SCHWA
+        return (_R, _CONS_CODES[m.group("rc")], vowel)
+    if kind == "cons":
+        base = _CONS_CODES[m.group("cc")]
+        ry = m.group("ry")
+        if ry:
+            ryv = m.group("ryv")
+            glide = _R if ry == "ර" else _J
+            return (base, glide, _VOWEL_SIGN_CODES[ryv]) if ryv else (base, glide)
+        if m.group("ck"):
+            return (base,)
+        cv = m.group("cv")
+        return (base, _VOWEL_SIGN_CODES[cv[-1]] if cv else SCHWA)
+    if kind == "iv":
+        return (_INDEP_CODES[cluster],)
+    if kind == "sp":
+        return (_SPECIAL_CODES[cluster],)
+    if kind == "vs":
+        return (_VOWEL_SIGN_CODES[cluster],)
+    if kind == "virama":
+        return ()
+    return (LITERAL_BASE + ord(cluster),)
+
+
+def _build_cluster_table() -> dict:
+    vowel_tails = ["", VIRAMA, *VOWEL_SIGNS]
+    clusters = [*INDEP_VOWELS, *SPECIAL_SIGNS, *VOWEL_SIGNS, VIRAMA, ZWJ]
+    for c in CONS_MAP:
+        clusters += [c + tail for tail in vowel_tails]
+        clusters += ["ර" + VIRAMA + c + tail for tail in vowel_tails]
+        for glide in ("ර", "ය"):
+            rak = c + VIRAMA + ZWJ + glide
+            clusters += [rak] + [rak + v for v in VOWEL_SIGNS]
+    return {cl: _cluster_codes(cl) for cl in clusters}
+
+_CLUSTER_TABLE = _build_cluster_table()
+
+
+def word_to_initial_phonemes(word: str) -> array:
+    """Scan a word into phoneme codes, one grapheme cluster at a time."""
+    out = new_tokens()
+    table = _CLUSTER_TABLE
+    for cluster in _SPLIT_RE.findall(word):
+        codes = table.get(cluster)
+        if codes is None:
+            codes = _cluster_codes(cluster)
+            if len(cluster) <= _MAX_TABLE_CLUSTER:
+                table[cluster] = codes
+        out.extend(codes)
+    return out
+
+
+def rule1_initial_schwa_to_a(tokens: array) -> bool:
     """
     Rule #1: If the nucleus of the first syllable is schwa, replace with 'a'
     EXCEPT:
@@ -206,128 +234,145 @@ def rule1_initial_schwa_to_a(tokens: List[str]) -> bool:
     """
     # find index of first vowel token
     for idx, t in enumerate(tokens):
-        if t in VOWEL_TOKENS:
+        if t in VOWEL_IDS:
             first_v_idx = idx
             break
     else:
         return False
 
-    if tokens[first_v_idx] != "ə":
+    if tokens[first_v_idx] != SCHWA:
         return False
 
     # Exception: single CV (e.g., ['d', 'ə'])
-    if len(tokens) == 2 and is_consonant_token(tokens[0]) and tokens[1] == "ə":
+    if len(tokens) == 2 and is_consonant_token(tokens[0]) and tokens[1] == SCHWA:
         return False
 
     # Exception: starts with sv cluster
-    if len(tokens) >= 2 and tokens[0] == "s" and tokens[1] == "ʋ":
+    if len(tokens) >= 2 and tokens[0] == _S and tokens[1] == _SV_V:
         return False
 
     # Exception approximation: k ə r (if this exact sequence appears at start)
-    if len(tokens) >= 3 and tokens[0] == "k" and tokens[1] == "ə" and tokens[2] == "r":
+    if len(tokens) >= 3 and tokens[0] == _K and tokens[1] == SCHWA and tokens[2] == _R:
         return False
 
     # otherwise change first schwa to 'a'
-    tokens[first_v_idx] = "a"
+    tokens[first_v_idx] = _A
     return True
 
-def rule2_r_context(tokens: List[str]) -> bool:
+# -------------------------
+# Iterated context rules (#2, #3, #4, #7)
+# -------------------------
+# These rules can trigger each other, so they are applied to a fixed point.
+# Each one is a declarative context pattern: one set of allowed codes per
+# token, the offset of the token to rewrite and its replacement.
+class RewriteRule(NamedTuple):
+    name: str
+    pattern: Tuple[FrozenSet[int], ...]
+    target: int
+    replacement: int
+
+
+def _codes(*codes: int) -> FrozenSet[int]:
+    return frozenset(codes)
+
+_C = CONSONANT_IDS
+
+REWRITE_RULES: Tuple[RewriteRule, ...] = (
+    # Rule #2 family: r-context alternations
+    #  - C r ə h  -> C r a h
+    #  - C r ə C(not h) -> C r a C
+    #  - C r a C -> C r ə C  (the alternating rule per the paper)
+    RewriteRule("rule2_r_schwa_h", (_C, _codes(_R), _codes(SCHWA), _codes(_H)), 2, _A),
+    RewriteRule("rule2_r_schwa_c", (_C, _codes(_R), _codes(SCHWA), _C - {_H}), 2, _A),
+    RewriteRule("rule2_r_a_c", (_C, _codes(_R), _codes(_A), _C), 2, SCHWA),
+    # Rule #3: V ə h  (V in {a,e,æ,o,ə}) -> V a h
+    RewriteRule("rule3_v_schwa_h", (_RULE3_LEFT, _codes(SCHWA), _codes(_H)), 1, _A),
+    # Rule #4: ə C1 C2 -> a C1 C2 (schwa -> a before consonant cluster)
+    RewriteRule("rule4_schwa_before_cluster", (_codes(SCHWA), _C, _C), 0, _A),
+    # Rule #7: k ə (r|l) u -> k a (r|l) u
+    RewriteRule("rule7_k_r_l_u", (_codes(_K), _codes(SCHWA), _LIQUIDS, _codes(_U)), 1, _A),
+)
+
+
+def compile_rewrite_rules(rules: Sequence[RewriteRule]) -> Tuple[Dict[int, List[RewriteRule]], int]:
     """
-    Rule #2 family: r-context alternations. Implemented as several passes:
-     - C r ə h  -> C r a h
-     - C r ə C(not h) -> C r a C
-     - C r a C -> C r ə C  (an alternating rule per the paper; we implement both and rely on iteration)
+    Index rules by the codes their first pattern element accepts (keeping
+    rule order within each bucket) and return the index plus the widest window.
     """
-    changed = False
-    i = 0
-    while i + 3 <= len(tokens) - 1:
-        # pattern C r ə h
-        if is_consonant_token(tokens[i]) and tokens[i+1] == "r" and tokens[i+2] == "ə" and tokens[i+3] == "h":
-            tokens[i+2] = "a"
-            changed = True
-            i += 4
-            continue
-        # pattern C r ə C (C != 'h')
-        if is_consonant_token(tokens[i]) and tokens[i+1] == "r" and tokens[i+2] == "ə" and is_consonant_token(tokens[i+3]) and tokens[i+3] != "h":
-            tokens[i+2] = "a"
-            changed = True
-            i += 4
-            continue
-        # pattern C r a C -> C r ə C  (may toggle)
-        if is_consonant_token(tokens[i]) and tokens[i+1] == "r" and tokens[i+2] == "a" and is_consonant_token(tokens[i+3]):
-            tokens[i+2] = "ə"
-            changed = True
-            i += 4
-            continue
-        i += 1
-    return changed
+    by_first: Dict[int, List[RewriteRule]] = {}
+    for rule in rules:
+        for code in rule.pattern[0]:
+            by_first.setdefault(code, []).append(rule)
+    return by_first, max(len(rule.pattern) for rule in rules)
 
-def rule3_v_ә_h(tokens: List[str]) -> bool:
-    """
-    Rule #3: V ə h  (V in {a,e,æ,o,ə}) -> V a h
-    """
-    changed = False
-    i = 0
-    while i + 2 < len(tokens):
-        if tokens[i] in {"a", "e", "æ", "o", "ə"} and tokens[i+1] == "ə" and tokens[i+2] == "h":
-            tokens[i+1] = "a"
-            changed = True
-            i += 3
-            continue
-        i += 1
-    return changed
+_RULES_BY_FIRST, _MAX_WINDOW = compile_rewrite_rules(REWRITE_RULES)
 
-def rule4_schwa_before_cluster(tokens: List[str]) -> bool:
-    """
-    Rule #4: ə C1 C2 -> a C1 C2 (schwa -> a before consonant cluster)
-    """
-    changed = False
-    i = 0
-    while i + 2 < len(tokens):
-        if tokens[i] == "ə" and is_consonant_token(tokens[i+1]) and is_consonant_token(tokens[i+2]):
-            tokens[i] = "a"
-            changed = True
-            i += 3
-            continue
-        i += 1
-    return changed
 
-def rule7_k_r_l_u(tokens: List[str]) -> bool:
+def rewrite_to_fixpoint(tokens: array, trace: Optional[list] = None) -> int:
     """
-    Rule #7: k ə (r|l) u -> k a (r|l) u
+    Apply REWRITE_RULES in place until none matches; returns the number of rewrites.
+
+    The scan goes left to right trying rules in declaration order. After a
+    rewrite it only steps back over the windows that can contain the changed
+    token, since nothing further left can have changed. A token is never
+    rewritten back to a value it already held, which stops the rule #2
+    a <-> ə alternation from cycling: each token changes at most once per
+    distinct replacement value, so the loop always terminates in O(n) steps.
+
+    If `trace` is a list, (rule name, token index) is appended for each rewrite.
     """
-    changed = False
+    n = len(tokens)
+    by_first = _RULES_BY_FIRST
+    history: Dict[int, set] = {}
+    fired = 0
     i = 0
-    while i + 3 < len(tokens):
-        if tokens[i] == "k" and tokens[i+1] == "ə" and tokens[i+2] in {"r", "l"} and tokens[i+3] == "u":
-            tokens[i+1] = "a"
-            changed = True
-            i += 4
-            continue
-        i += 1
-    return changed
+    while i < n:
+        for rule in by_first.get(tokens[i], ()):
+            pattern = rule.pattern
+            width = len(pattern)
+            if i + width > n:
+                continue
+            k = 1
+            while k < width and tokens[i + k] in pattern[k]:
+                k += 1
+            if k < width:
+                continue
+            slot = i + rule.target
+            held = history.setdefault(slot, {tokens[slot]})
+            if rule.replacement in held:
+                continue
+            held.add(rule.replacement)
+            tokens[slot] = rule.replacement
+            fired += 1
+            if trace is not None:
+                trace.append((rule.name, slot))
+            i = max(0, slot - _MAX_WINDOW + 1)
+            break
+        else:
+            i += 1
+    return fired
 
-def rule5_wordfinal(tokens: List[str]) -> bool:
+def rule5_wordfinal(tokens: array) -> bool:
     """
     Rule #5: Word-final ... ə C$ -> ... a C$ except when C in {r,b,ɖ,ʈ}
     """
-    if len(tokens) >= 2 and tokens[-2] == "ə" and is_consonant_token(tokens[-1]):
-        if tokens[-1] not in {"r", "b", "ɖ", "ʈ"}:
-            tokens[-2] = "a"
+    if len(tokens) >= 2 and tokens[-2] == SCHWA and is_consonant_token(tokens[-1]):
+        if tokens[-1] not in _RULE5_EXCEPT:
+            tokens[-2] = _A
             return True
     return False
 
-def rule6_aji(tokens: List[str]) -> bool:
+def rule6_aji(tokens: array) -> bool:
     """
     Rule #6: ... ə j i $ -> ... a j i $
     (end of token list pattern)
     """
-    if len(tokens) >= 3 and tokens[-3] == "ə" and tokens[-2] == "j" and tokens[-1] == "i":
-        tokens[-3] = "a"
+    if len(tokens) >= 3 and tokens[-3] == SCHWA and tokens[-2] == _J and tokens[-1] == _I:
+        tokens[-3] = _A
         return True
     return False
 
-def rule8_kal_contexts(tokens: List[str]) -> bool:
+def rule8_kal_contexts(tokens: array) -> bool:
     """
     Rule #8: Several kal-specific alternations (conservative implementation)
     We implement:
@@ -340,93 +385,511 @@ def rule8_kal_contexts(tokens: List[str]) -> bool:
     i = 0
     while i + 3 < len(tokens):
         # pattern k a l X j  where X is a long vowel
-        if tokens[i] == "k" and tokens[i+1] in {"a", "aː"} and tokens[i+2] == "l" and i+3 < len(tokens):
+        if tokens[i] == _K and tokens[i+1] in _KAL_A and tokens[i+2] == _L and i+3 < len(tokens):
             # If next is long vowel and later 'j'
-            if i+3 < len(tokens) and tokens[i+3] in {"aː","eː","oː"}:
+            if i+3 < len(tokens) and tokens[i+3] in _LONG_VOWELS:
                 # require 'j' after it
-                if i+4 < len(tokens) and tokens[i+4] == "j":
-                    tokens[i+1] = "ə"
+                if i+4 < len(tokens) and tokens[i+4] == _J:
+                    tokens[i+1] = SCHWA
                     changed = True
             # other kal patterns
         i += 1
     # Additional simpler rule: if starts with ['k','a','l','ə'] change a->ə
-    if len(tokens) >= 3 and tokens[0] == "k" and tokens[1] == "a" and tokens[2] == "l":
+    if len(tokens) >= 3 and tokens[0] == _K and tokens[1] == _A and tokens[2] == _L:
         # convert tokens[1] -> 'ə' if not already
-        if tokens[1] != "ə":
-            tokens[1] = "ə"
+        if tokens[1] != SCHWA:
+            tokens[1] = SCHWA
             changed = True
     return changed
 
 
-def apply_all_rules(tokens: List[str]) -> List[str]:
+def _apply_once(rule, tokens: array, trace: Optional[list]) -> None:
+    """Run a single-pass rule, recording the indices it changed when tracing."""
+    if trace is None:
+        rule(tokens)
+        return
+    before = new_tokens(tokens)
+    if rule(tokens):
+        trace.extend((rule.__name__, i) for i, (a, b) in enumerate(zip(before, tokens)) if a != b)
+
+
+def apply_all_rules(tokens: array, trace: Optional[list] = None) -> array:
     """
-    Apply the rule set in order. Repeat the group of rules that must be
-    applied until no change (these rules can trigger each other).
+    Apply the rule set in order. The group of rules that can trigger each
+    other (#2, #3, #4, #7) is run to a fixed point by rewrite_to_fixpoint().
+
+    If `trace` is a list, (rule name, token index) is appended for every
+    rewrite, in the order they happened.
     """
     # Work on a copy
-    toks = list(tokens)
+    toks = new_tokens(tokens)
     # Rule #1 once (initial schwa -> a) — paper applies just once
-    _ = rule1_initial_schwa_to_a(toks)
+    _apply_once(rule1_initial_schwa_to_a, toks, trace)
 
     # Rules #2,#3,#4,#7 repeat until stable
-    changed = True
-    while changed:
-        changed = False
-        if rule2_r_context(toks):
-            changed = True
-        if rule3_v_ә_h(toks):
-            changed = True
-        if rule4_schwa_before_cluster(toks):
-            changed = True
-        if rule7_k_r_l_u(toks):
-            changed = True
+    rewrite_to_fixpoint(toks, trace)
 
     # Then rule #5, #6, #8 (single final passes)
-    _ = rule5_wordfinal(toks)
-    _ = rule6_aji(toks)
-    _ = rule8_kal_contexts(toks)
+    _apply_once(rule5_wordfinal, toks, trace)
+    _apply_once(rule6_aji, toks, trace)
+    _apply_once(rule8_kal_contexts, toks, trace)
 
     return toks
 
 
-def tokens_to_string(tokens: List[str]) -> str:
+def tokens_to_string(tokens: array) -> str:
     """
-    Convert the token list back to a readable IPA string.
-    We join tokens without separator but keep punctuation and whitespace tokens unchanged.
+    Convert the token array back to a readable IPA string.
+    Phoneme codes become their IPA pieces (multi-char allowed); literal codes
+    (punctuation etc. from the original word) become the original character.
     """
-    # punctuation / whitespace tokens are single characters from original; keep them as is.
-    out = []
-    for t in tokens:
-        out.append(t)
-    # Simply concatenate tokens; tokens are IPA pieces (multi-char allowed).
-    return "".join(out)
+    return "".join([PHONEMES[t] if t < LITERAL_BASE else chr(t - LITERAL_BASE) for t in tokens])
+
+
+_IPA_SPLIT_RE = re.compile(
+    "|".join(re.escape(p) for p in sorted(PHONEMES, key=len, reverse=True)) + "|.", re.DOTALL
+)
+
+
+def ipa_to_tokens(ipa: str) -> array:
+    """Inverse of tokens_to_string: longest-match inventory phonemes, other characters as literals."""
+    get = PHONEME_ID.get
+    return new_tokens([
+        get(piece, LITERAL_BASE + ord(piece[0]))
+        for piece in _IPA_SPLIT_RE.findall(ipa)
+    ])
+
+
+# -------------------------
+# Rule-set version and word pronunciation cache
+# -------------------------
+_SINGLE_PASS_RULES = (rule1_initial_schwa_to_a, rule5_wordfinal, rule6_aji, rule8_kal_contexts)
+
+
+def ruleset_version() -> str:
+    """Short fingerprint of the grapheme tables and rules; changes whenever they do."""
+    h = hashlib.sha1()
+    for table in (CONS_MAP, VOWEL_SIGNS, INDEP_VOWELS, SPECIAL_SIGNS):
+        h.update(repr(sorted(table.items())).encode("utf-8"))
+    h.update(repr(PHONEMES).encode("utf-8"))
+    for rule in REWRITE_RULES:
+        pattern = [sorted(codes) for codes in rule.pattern]
+        h.update(repr((rule.name, pattern, rule.target, rule.replacement)).encode("utf-8"))
+    for rule in _SINGLE_PASS_RULES:
+        h.update(rule.__name__.encode("utf-8"))
+        h.update(rule.__code__.co_code)
+    return h.hexdigest()[:12]
+
+
+class WordCache:
+    """
+    Bounded LRU map from an NFC-normalized word to its (tokens, IPA)
+    pronunciation, with hit/miss/eviction counters. Thread-safe: one cache
+    is shared by the streaming front-end and the server's worker threads.
+    """
+
+    def __init__(self, maxsize: int = 100_000):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.ruleset = ruleset_version()
+        self._data: "OrderedDict[str, Tuple[array, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, word: str) -> Optional[Tuple[array, str]]:
+        with self._lock:
+            entry = self._data.get(word)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(word)
+            self.hits += 1
+            return entry
+
+    def put(self, word: str, entry: Tuple[array, str]) -> None:
+        with self._lock:
+            self._data[word] = entry
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.ruleset = ruleset_version()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "ruleset": self.ruleset,
+            }
+
+
+_word_cache: Optional[WordCache] = None
+
+
+def enable_word_cache(maxsize: int = 100_000) -> WordCache:
+    """Turn on the in-process pronunciation cache (replacing any existing one)."""
+    global _word_cache
+    _word_cache = WordCache(maxsize)
+    return _word_cache
+
+def disable_word_cache() -> None:
+    global _word_cache
+    _word_cache = None
+
+def invalidate_word_cache() -> None:
+    """Drop cached pronunciations, e.g. after editing the grapheme tables or rules."""
+    if _word_cache is not None:
+        _word_cache.clear()
+
+def word_cache_stats() -> Optional[dict]:
+    return None if _word_cache is None else _word_cache.stats()
+
+
+# -------------------------
+# Pronunciation lexicon
+# -------------------------
+# A read-only marisa-trie of NFC word -> IPA built by build_lexicon.py. It is
+# memory-mapped, so worker processes share the pages of one file, and it is
+# consulted before the rules (hand-corrected exceptions live here).
+_lexicon = None
+_lexicon_id: Optional[str] = None
+
+
+def load_lexicon(path: str) -> None:
+    """Memory-map a lexicon built by build_lexicon.py and consult it before the rules."""
+    import marisa_trie
+
+    global _lexicon, _lexicon_id
+    trie = marisa_trie.BytesTrie()
+    trie.mmap(path)
+    st = os.stat(path)
+    _lexicon = trie
+    _lexicon_id = f"{os.path.basename(path)}:{st.st_size}:{st.st_mtime_ns}"
+    invalidate_word_cache()
+
+def unload_lexicon() -> None:
+    global _lexicon, _lexicon_id
+    _lexicon = None
+    _lexicon_id = None
+    invalidate_word_cache()
+
+def pronunciation_version() -> str:
+    """ruleset_version() plus the identity of the loaded lexicon, if any."""
+    if _lexicon_id is None:
+        return ruleset_version()
+    return ruleset_version() + "-" + hashlib.sha1(_lexicon_id.encode("utf-8")).hexdigest()[:8]
+
+def lexicon_lookup(word: str) -> Optional[str]:
+    """IPA for an NFC-normalized word from the loaded lexicon, or None."""
+    if _lexicon is None:
+        return None
+    values = _lexicon.get(word)
+    return values[0].decode("utf-8") if values else None
+
+
+def set_rewrite_rules(rules: Sequence[RewriteRule]) -> None:
+    """Replace the iterated rule set (#2, #3, #4, #7) and invalidate the word cache."""
+    global REWRITE_RULES, _RULES_BY_FIRST, _MAX_WINDOW
+    REWRITE_RULES = tuple(rules)
+    _RULES_BY_FIRST, _MAX_WINDOW = compile_rewrite_rules(REWRITE_RULES)
+    invalidate_word_cache()
+
+
+def _cached_pronunciation(cache: WordCache, word: str) -> Tuple[array, str]:
+    word = normalize_text(word)
+    entry = cache.get(word)
+    if entry is None:
+        ipa = lexicon_lookup(word)
+        if ipa is not None:
+            entry = (ipa_to_tokens(ipa), ipa)
+        else:
+            toks = apply_all_rules(word_to_initial_phonemes(word))
+            entry = (toks, tokens_to_string(toks))
+        cache.put(word, entry)
+    return entry
+
+
+def sinhala_to_tokens(word: str) -> array:
+    """Lexicon entry or scanner + rules for one word, without serializing to a string."""
+    if _word_cache is not None:
+        return new_tokens(_cached_pronunciation(_word_cache, word)[0])
+    if _lexicon is not None:
+        ipa = lexicon_lookup(normalize_text(word))
+        if ipa is not None:
+            return ipa_to_tokens(ipa)
+    return apply_all_rules(word_to_initial_phonemes(word))
 
 
 def sinhala_to_ipa(word: str) -> str:
-    toks = word_to_initial_phonemes(word)
-    toks2 = apply_all_rules(toks)
-    return tokens_to_string(toks2)
+    if _word_cache is not None:
+        return _cached_pronunciation(_word_cache, word)[1]
+    if _lexicon is not None:
+        ipa = lexicon_lookup(normalize_text(word))
+        if ipa is not None:
+            return ipa
+    return tokens_to_string(apply_all_rules(word_to_initial_phonemes(word)))
+
+_WORD_RE = re.compile(r"\S+")
+_PIECE_RE = re.compile(r"\S+|\s+")
+# Longest run without whitespace iter_convert() will hold back between chunks
+_MAX_STREAM_WORD = 4096
+
+
+def _word_to_ipa(m: "re.Match") -> str:
+    return sinhala_to_ipa(m.group())
+
 
 def convert_text(text: str) -> str:
     text = normalize_text(text)
-    # Convert token-by-token (preserve punctuation & whitespace)
-    tokens = re.findall(r"\S+|\s+", text)
-    out = []
-    for tok in tokens:
-        if tok.isspace():
-            out.append(tok)
-        else:
-            out.append(sinhala_to_ipa(tok))
-    return "".join(out)
-
-def convert_file(input_path: str, output_path: str):
-    with open(input_path, "r", encoding="utf-8") as f:
-        content = f.read()
-    ipa = convert_text(content)
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(ipa)
+    # Convert word-by-word in one substitution pass (whitespace is left as is)
+    return _WORD_RE.sub(_word_to_ipa, text)
+
+
+def convert_batch(texts: Sequence[str], return_tokens: bool = False):
+    """
+    Convert a batch of texts, phonemizing each distinct word only once.
+
+    Returns the IPA strings, or (IPA strings, token arrays) when
+    `return_tokens` is set; a text's token array holds its words' phoneme
+    codes with whitespace kept as literal codes, so tokens_to_string() of it
+    equals its IPA string.
+    """
+    normalized = [normalize_text(text) for text in texts]
+    unique = {word: None for text in normalized for word in _WORD_RE.findall(text)}
+
+    if not return_tokens:
+        ipa = {word: sinhala_to_ipa(word) for word in unique}
+        return [_WORD_RE.sub(lambda m: ipa[m.group()], text) for text in normalized]
+
+    word_tokens = {word: sinhala_to_tokens(word) for word in unique}
+    ipa = {word: tokens_to_string(toks) for word, toks in word_tokens.items()}
+    strings, token_arrays = [], []
+    for text in normalized:
+        strings.append(_WORD_RE.sub(lambda m: ipa[m.group()], text))
+        toks = new_tokens()
+        for piece in _PIECE_RE.findall(text):
+            if piece in word_tokens:
+                toks.extend(word_tokens[piece])
+            else:
+                toks.extend([LITERAL_BASE + ord(ch) for ch in piece])
+        token_arrays.append(toks)
+    return strings, token_arrays
+
+
+# -------------------------
+# Model-ready symbol IDs (see symbols.py)
+# -------------------------
+_symbol_ids_by_code: Dict[int, Tuple[int, ...]] = {}
+_multichar_ids_by_code: Dict[int, Tuple[int, ...]] = {}
+
+
+def _code_symbol_ids(code: int) -> Tuple[int, ...]:
+    ids = _symbol_ids_by_code.get(code)
+    if ids is None:
+        import symbols
+
+        piece = PHONEMES[code] if code < LITERAL_BASE else chr(code - LITERAL_BASE)
+        piece = symbols.map_phonemes(piece.lower())
+        get = symbols.SYMBOL_TO_ID.get
+        ids = tuple(i for i in (get(ch) for ch in piece) if i is not None)
+        if code < LITERAL_BASE and len(ids) != len(piece):
+            raise ValueError(f"g2p phoneme {PHONEMES[code]!r} has no symbols in symbols.VOCAB")
+        _symbol_ids_by_code[code] = ids
+    return ids
+
+
+def _code_multichar_ids(code: int) -> Tuple[int, ...]:
+    ids = _multichar_ids_by_code.get(code)
+    if ids is None:
+        import symbols
+
+        piece = PHONEMES[code] if code < LITERAL_BASE else chr(code - LITERAL_BASE)
+        piece = symbols.map_phonemes(piece.lower())
+        ids = tuple(symbols.MULTICHAR_TRIE.encode_phoneme(piece))
+        if code < LITERAL_BASE and symbols.MULTICHAR_TRIE.decode(ids) != piece:
+            raise ValueError(f"g2p phoneme {PHONEMES[code]!r} has no symbols in symbols.MULTICHAR_VOCAB")
+        _multichar_ids_by_code[code] = ids
+    return ids
+
+
+def tokens_to_symbol_ids(tokens: array, multichar: bool = False):
+    """
+    Training symbol IDs (int32 NumPy array) for a token array, equal to
+    symbols.text_to_ids(tokens_to_string(tokens)) but without building the
+    IPA string: whitespace runs collapse to one space and are stripped at
+    the ends, as the basic_cleaners text cleaner does.
+
+    With multichar=True the IDs are in symbols.MULTICHAR_VOCAB and every
+    token is encoded on its own, so a token like "ru" becomes the "ru"
+    symbol while r followed by u stays two symbols.
+    """
+    import numpy as np
+    import symbols
+
+    code_ids = _code_multichar_ids if multichar else _code_symbol_ids
+    space_id = symbols.MULTICHAR_TRIE.symbol_to_id[" "] if multichar else symbols.SPACE_ID
+    out: List[int] = []
+    started = pending_space = False
+    for code in tokens:
+        if code >= LITERAL_BASE and chr(code - LITERAL_BASE).isspace():
+            pending_space = started
+            continue
+        if pending_space:
+            out.append(space_id)
+            pending_space = False
+        started = True
+        out.extend(code_ids(code))
+    return np.asarray(out, dtype=np.int32)
+
+
+def check_phoneme_symbols() -> None:
+    """Raise if any phoneme g2p can emit has no symbol IDs in either vocabulary."""
+    for code in range(len(PHONEMES)):
+        for code_ids in (_code_symbol_ids, _code_multichar_ids):
+            if not code_ids(code):
+                raise ValueError(f"g2p phoneme {PHONEMES[code]!r} encodes to no symbol IDs")
+
+
+def text_to_symbol_ids(text: str, multichar: bool = False):
+    """Sinhala text straight to training symbol IDs."""
+    _, (tokens,) = convert_batch([text], return_tokens=True)
+    return tokens_to_symbol_ids(tokens, multichar)
+
+
+def convert_metadata(input_path: str, output_path: str, ids_path: str,
+                     text_column: int = 1, batch_size: int = 1000, multichar: bool = False) -> None:
+    """
+    Phonemize a "file_id|...|text" metadata file into "file_id|text|ipa" rows
+    (the format the ljspeech formatter reads) and save the symbol IDs of every
+    IPA string to `ids_path`, so training reads model-ready inputs instead of
+    re-tokenizing text (see sinhala_tokenizer.PrecomputedIdsTokenizer).
+
+    `multichar` selects the multi-character symbol vocabulary
+    (sinhala_tokenizer.SymbolCharacters) instead of the character one.
+    """
+    import csv
+    import symbols
+
+    ids_by_text = {}
+
+    def flush(rows):
+        ipa_texts, token_arrays = convert_batch([text for _, text in rows], return_tokens=True)
+        for (file_id, text), ipa, tokens in zip(rows, ipa_texts, token_arrays):
+            writer.writerow([file_id, text, ipa])
+            if ipa not in ids_by_text:
+                ids_by_text[ipa] = tokens_to_symbol_ids(tokens, multichar)
+
+    with open(input_path, "r", encoding="utf-8", newline="") as fin, \
+            open(output_path, "w", encoding="utf-8", newline="") as fout:
+        writer = csv.writer(fout, delimiter="|")
+        rows = []
+        for row in csv.reader(fin, delimiter="|"):
+            if len(row) <= text_column:
+                continue
+            text = row[text_column].replace("\n", " ").replace("\r", " ").strip()
+            rows.append((row[0], text))
+            if len(rows) == batch_size:
+                flush(rows)
+                rows = []
+        if rows:
+            flush(rows)
+
+    vocab = symbols.MULTICHAR_VOCAB if multichar else symbols.VOCAB
+    symbols.save_ids_cache(ids_path, ids_by_text, vocab)
+    print(f"[✓] Converted {input_path} → {output_path} ({len(ids_by_text)} ID sequences → {ids_path})")
+
+
+def iter_convert(f: TextIO, chunk_size: int = 1 << 20) -> Iterator[str]:
+    """
+    Yield the IPA of a text stream piece by piece, reading `chunk_size`
+    characters at a time and cutting each chunk after its last whitespace so
+    no word is split. Memory stays bounded by the chunk size (plus at most
+    _MAX_STREAM_WORD characters carried over).
+    """
+    carry = ""
+    while True:
+        block = f.read(chunk_size)
+        if not block:
+            break
+        block = carry + block
+        cut = len(block)
+        while cut and not block[cut - 1].isspace():
+            cut -= 1
+        if cut == 0:
+            if len(block) < chunk_size + _MAX_STREAM_WORD:
+                carry = block
+                continue
+            # No whitespace for far too long: emit it rather than grow the carry
+            cut = len(block)
+        carry = block[cut:]
+        yield convert_text(block[:cut])
+    if carry:
+        yield convert_text(carry)
+
+
+def convert_file(input_path: str, output_path: str, chunk_size: int = 1 << 20):
+    """Convert a text file to IPA, streaming it through iter_convert()."""
+    with open(input_path, "r", encoding="utf-8") as fin, \
+            open(output_path, "w", encoding="utf-8") as fout:
+        for piece in iter_convert(fin, chunk_size):
+            fout.write(piece)
     print(f"[✓] Converted {input_path} → {output_path}")
 
+def convert_lines(lines: List[str]) -> str:
+    """Worker for convert_file_parallel(): convert one shard of lines."""
+    return convert_text("".join(lines))
+
+
+def _init_parallel_worker(lexicon_path: Optional[str], word_cache_size: Optional[int]) -> None:
+    if lexicon_path:
+        load_lexicon(lexicon_path)
+    if word_cache_size:
+        enable_word_cache(word_cache_size)
+
+
+def convert_file_parallel(
+    input_path: str,
+    output_path: str,
+    workers: Optional[int] = None,
+    shard_lines: int = 20_000,
+    resume: bool = True,
+    lexicon_path: Optional[str] = None,
+    word_cache_size: Optional[int] = 100_000,
+) -> None:
+    """
+    Convert a text file to IPA on a process pool, in line-aligned shards
+    written back in input order. An interrupted run resumes from the last
+    completed shard (see corpus_parallel.run_sharded).
+    """
+    job = {
+        "input": os.path.abspath(input_path),
+        "shard_lines": shard_lines,
+        "lexicon": lexicon_path,
+        "ruleset": ruleset_version(),
+    }
+    corpus_parallel.run_sharded(
+        corpus_parallel.iter_line_shards(input_path, shard_lines),
+        convert_lines,
+        output_path,
+        job,
+        workers=workers,
+        resume=resume,
+        initializer=_init_parallel_worker,
+        initargs=(lexicon_path, word_cache_size),
+    )
+
 if __name__ == "__main__":
     # input_text = """මෛත‍්‍රී පාලනයක්' හදන්න ඇවිල්ලා අද මේ අය ගෙන යන්නේ තුච්ඡ, නින්දිත පාලනයක්
     # කාටවත් ලෙඩේ නම් හොඳ කරන්න බැරි වුණා. මං වතුපිටිවල ඉස්පිරිත‍ාලෙ ළඟ ආයතනයක වැඩ කරනවා පරිගණක නිලධාරිනියක් හැටියට.
@@ -436,5 +899,8 @@ if __name__ == "__main__":
     # කුමරු කාර්යං කරලා ගියේ නාගරික මණ්ඩපය."""
     # print("input:", input_text)
     # print("output:", convert_text(input_text))
+    # Every phoneme reaches the model: none is dropped by the symbol encoders
+    check_phoneme_symbols()
+    print(f"[✓] {len(PHONEMES)} g2p phonemes encode to symbol IDs")
     # Example usage
     convert_file("input.txt", "output_ipa.txt")
@@ -0,0 +1,289 @@
+# inference_checkpoint.py
+# Inference-only safetensors checkpoints for the Tacotron2 model and the
+# HiFi-GAN vocoder.
+#
+# Coqui .pth training checkpoints carry optimizer, scheduler and trainer
+# state next to the weights (and, for the vocoder, the whole discriminator),
+# and torch.load unpickles all of it into RAM. export_tts() / export_vocoder()
+# load a checkpoint the way Synthesizer does and write only what inference
+# needs to one .safetensors file:
+#
+# - Tacotron2: the model state dict; the reduction rate `r` the checkpoint
+#   was trained down to and the model config go in the file's metadata.
+# - HiFi-GAN: the generator only, with weight norm already folded into the
+#   conv weights; the vocoder config goes in the metadata.
+#
+# load_tts_model() / load_vocoder_model() memory-map the file and make the
+# model parameters views of the mapping (load_state_dict(assign=True)), so
+# nothing is copied and several worker processes on one host share the same
+# page-cache pages for the weights. load_synthesizer() builds a Coqui
+# Synthesizer, choosing the format of the TTS model and of the vocoder
+# separately (an exported Tacotron2 can run with a .pth vocoder and vice
+# versa); tts_inference.get_synthesizer() uses it whenever either path is a
+# .safetensors export.
+#
+# Usage:
+#   export_tts("checkpoint_303000.pth", "config.json", "sinhala_tacotron2.safetensors")
+#   export_vocoder("model_file.pth", "config.json", "hifigan_v2.safetensors")
+#
+# Export both and compare load time and memory (fresh process each):
+#   TTS_MODEL_PATH=... TTS_CONFIG_PATH=... VOCODER_MODEL_PATH=... \
+#   VOCODER_CONFIG_PATH=... python inference_checkpoint.py
+
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, Optional, Tuple
+
+FORMAT_VERSION = "1"
+
+
+# -------------------------
+# Helpers
+# -------------------------
+def is_exported(path: Optional[str]) -> bool:
+    return bool(path) and path.endswith(".safetensors")
+
+
+def _pth_config(checkpoint_path: str, config_path: Optional[str]):
+    from TTS.config import load_config
+
+    if not config_path:
+        raise ValueError(f"{checkpoint_path} needs its config.json; only .safetensors exports carry their config")
+    return load_config(config_path)
+
+
+def _config_to_metadata(config) -> str:
+    return json.dumps(config.to_dict(), ensure_ascii=False, default=str)
+
+
+def _config_from_metadata(text: str):
+    """Coqui config object from exported JSON (what TTS.config.load_config does after reading the file)."""
+    from TTS.config import register_config
+
+    config_dict = json.loads(text)
+    model_name = config_dict["model"] if "model" in config_dict else config_dict["generator_model"]
+    model_name = model_name.replace("_generator", "").replace("_discriminator", "")
+    config = register_config(model_name)()
+    config.from_dict(config_dict)
+    return config
+
+
+def _save(state: Dict, path: str, metadata: Dict[str, str]) -> int:
+    from safetensors.torch import save_file
+
+    tensors = {}
+    seen = set()
+    for name, tensor in state.items():
+        tensor = tensor.detach().cpu().contiguous()
+        # safetensors refuses tensors that share memory; give tied weights their own copy
+        if tensor.data_ptr() in seen:
+            tensor = tensor.clone()
+        seen.add(tensor.data_ptr())
+        tensors[name] = tensor
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    save_file(tensors, tmp_path, metadata={"format": "pt", "version": FORMAT_VERSION, **metadata})
+    os.replace(tmp_path, path)
+    return os.path.getsize(path)
+
+
+def _load(path: str, kind: str) -> Tuple[Dict, Dict[str, str]]:
+    """Memory-mapped tensors (copy-on-write, shared page cache) and metadata of an exported file."""
+    from safetensors import safe_open
+    from safetensors.torch import load_file
+
+    with safe_open(path, framework="pt") as f:
+        metadata = f.metadata() or {}
+    if metadata.get("kind") != kind:
+        raise ValueError(f"{path} is not an exported {kind} checkpoint (kind={metadata.get('kind')!r})")
+    return load_file(path, device="cpu"), metadata
+
+
+# -------------------------
+# Export
+# -------------------------
+def export_tts(checkpoint_path: str, config_path: str, output_path: str) -> int:
+    """Write the inference weights of a Tacotron2 training checkpoint; returns the file size."""
+    from TTS.config import load_config
+    from TTS.tts.models import setup_model
+
+    config = load_config(config_path)
+    model = setup_model(config)
+    # Coqui's own loader resolves `r` from the checkpoint (gradual training)
+    model.load_checkpoint(config, checkpoint_path, eval=True)
+    size = _save(model.state_dict(), output_path, {
+        "kind": "tts",
+        "config": _config_to_metadata(config),
+        "r": str(model.decoder.r),
+        "source": os.path.basename(checkpoint_path),
+    })
+    print(f"[✓] {checkpoint_path} ({os.path.getsize(checkpoint_path) / 2**20:.1f} MB) -> "
+          f"{output_path} ({size / 2**20:.1f} MB)")
+    return size
+
+
+def export_vocoder(checkpoint_path: str, config_path: str, output_path: str) -> int:
+    """Write the HiFi-GAN generator (weight norm folded in) of a vocoder checkpoint; returns the file size."""
+    from TTS.config import load_config
+    from TTS.vocoder.models import setup_model
+
+    config = load_config(config_path)
+    model = setup_model(config)
+    # eval=True drops the discriminator and removes weight norm from the generator
+    model.load_checkpoint(config, checkpoint_path, eval=True)
+    size = _save(model.model_g.state_dict(), output_path, {
+        "kind": "vocoder",
+        "config": _config_to_metadata(config),
+        "source": os.path.basename(checkpoint_path),
+    })
+    print(f"[✓] {checkpoint_path} ({os.path.getsize(checkpoint_path) / 2**20:.1f} MB) -> "
+          f"{output_path} ({size / 2**20:.1f} MB)")
+    return size
+
+
+# -------------------------
+# Memory-mapped loading
+# -------------------------
+def load_tts_model(path: str):
+    """(Tacotron2 model in eval mode with mmap-backed weights, config) from an exported file."""
+    from TTS.tts.models import setup_model
+
+    state, metadata = _load(path, "tts")
+    config = _config_from_metadata(metadata["config"])
+    model = setup_model(config)
+    model.load_state_dict(state, assign=True)
+    model.decoder.set_r(int(metadata["r"]))
+    model.eval()
+    return model, config
+
+
+def load_vocoder_model(path: str):
+    """(GAN vocoder in eval mode with mmap-backed generator weights, config) from an exported file."""
+    from TTS.vocoder.models import setup_model
+
+    state, metadata = _load(path, "vocoder")
+    config = _config_from_metadata(metadata["config"])
+    model = setup_model(config)
+    model.model_d = None
+    if hasattr(model.model_g, "remove_weight_norm"):
+        model.model_g.remove_weight_norm()
+    model.model_g.load_state_dict(state, assign=True)
+    model.eval()
+    return model, config
+
+
+def _load_pth_tts_model(checkpoint_path: str, config_path: Optional[str]):
+    from TTS.tts.models import setup_model
+
+    config = _pth_config(checkpoint_path, config_path)
+    model = setup_model(config)
+    model.load_checkpoint(config, checkpoint_path, eval=True)
+    return model, config
+
+
+def _load_pth_vocoder_model(checkpoint_path: str, config_path: Optional[str]):
+    from TTS.vocoder.models import setup_model
+
+    config = _pth_config(checkpoint_path, config_path)
+    model = setup_model(config)
+    model.load_checkpoint(config, checkpoint_path, eval=True)
+    return model, config
+
+
+def load_synthesizer(tts_path: str, tts_config: Optional[str] = None, vocoder_path: Optional[str] = None,
+                     vocoder_config: Optional[str] = None, use_cuda: bool = False):
+    """
+    Coqui Synthesizer set up as Synthesizer._load_tts/_load_vocoder would;
+    each of the two models is read from an export (mmap) or a .pth
+    checkpoint (with its config path) according to its own file.
+    """
+    from TTS.utils.audio import AudioProcessor
+    from TTS.utils.synthesizer import Synthesizer
+
+    synthesizer = Synthesizer(use_cuda=use_cuda)
+    synthesizer.tts_checkpoint = tts_path
+    if is_exported(tts_path):
+        synthesizer.tts_model, synthesizer.tts_config = load_tts_model(tts_path)
+    else:
+        synthesizer.tts_model, synthesizer.tts_config = _load_pth_tts_model(tts_path, tts_config)
+    synthesizer.output_sample_rate = synthesizer.tts_config.audio["sample_rate"]
+    if vocoder_path:
+        synthesizer.vocoder_checkpoint = vocoder_path
+        if is_exported(vocoder_path):
+            synthesizer.vocoder_model, synthesizer.vocoder_config = load_vocoder_model(vocoder_path)
+        else:
+            synthesizer.vocoder_model, synthesizer.vocoder_config = _load_pth_vocoder_model(
+                vocoder_path, vocoder_config)
+        synthesizer.vocoder_ap = AudioProcessor(verbose=False, **synthesizer.vocoder_config.audio)
+        synthesizer.output_sample_rate = synthesizer.vocoder_config.audio["sample_rate"]
+    if use_cuda:
+        # Moving to the GPU copies the weights out of the mapping
+        synthesizer.tts_model.cuda()
+        if synthesizer.vocoder_model is not None:
+            synthesizer.vocoder_model.cuda()
+    return synthesizer
+
+
+# -------------------------
+# Load benchmark
+# -------------------------
+def _report_load(tts_checkpoint: str, tts_config: Optional[str], vocoder_checkpoint: Optional[str],
+                 vocoder_config: Optional[str]) -> None:
+    """Runs in a fresh interpreter: load once, print timings and memory as JSON."""
+    import time
+
+    import psutil
+
+    import torch  # noqa: F401  (import time is not part of the load time)
+    import TTS.utils.synthesizer  # noqa: F401
+
+    from tts_inference import load_synthesizer
+
+    process = psutil.Process()
+    before = process.memory_info().rss
+    start = time.perf_counter()
+    load_synthesizer(tts_checkpoint, tts_config, vocoder_checkpoint, vocoder_config)
+    seconds = time.perf_counter() - start
+    memory = process.memory_full_info()
+    print(json.dumps({
+        "load_s": seconds,
+        "rss_mb": (memory.rss - before) / 2**20,
+        # Private pages only: what each extra worker process really costs
+        "uss_mb": getattr(memory, "uss", memory.rss) / 2**20,
+        "shared_mb": getattr(memory, "shared", 0) / 2**20,
+    }))
+
+
+def measure_load(tts_checkpoint: str, tts_config: Optional[str] = None, vocoder_checkpoint: Optional[str] = None,
+                 vocoder_config: Optional[str] = None) -> dict:
+    """Load time and memory of one checkpoint pair, measured in a fresh process."""
+    args = [tts_checkpoint, tts_config, vocoder_checkpoint, vocoder_config]
+    code = f"import inference_checkpoint; inference_checkpoint._report_load(*{args!r})"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    tts_model_path = os.environ["TTS_MODEL_PATH"]
+    tts_config_path = os.environ["TTS_CONFIG_PATH"]
+    vocoder_model_path = os.environ.get("VOCODER_MODEL_PATH")
+    vocoder_config_path = os.environ.get("VOCODER_CONFIG_PATH")
+    export_dir = os.environ.get("EXPORT_DIR", "export")
+
+    tts_export = os.path.join(export_dir, "tacotron2.safetensors")
+    export_tts(tts_model_path, tts_config_path, tts_export)
+    vocoder_export = None
+    if vocoder_model_path:
+        vocoder_export = os.path.join(export_dir, "vocoder.safetensors")
+        export_vocoder(vocoder_model_path, vocoder_config_path, vocoder_export)
+
+    rows = [
+        (".pth", measure_load(tts_model_path, tts_config_path, vocoder_model_path, vocoder_config_path)),
+        (".safetensors", measure_load(tts_export, None, vocoder_export, None)),
+    ]
+    print(f"{'checkpoint':<14} {'load':>8} {'RSS +':>10} {'private':>10} {'shared':>10}")
+    for name, r in rows:
+        print(f"{name:<14} {r['load_s']:7.2f}s {r['rss_mb']:8.1f}MB {r['uss_mb']:8.1f}MB {r['shared_mb']:8.1f}MB")
@@ -0,0 +1,100 @@
+# load_test.py
+# Load generator for tts_server.py: keeps `concurrency` requests in flight
+# against /synthesize for `duration` seconds (or `requests` requests) and
+# reports throughput, status counts and time-to-first-byte / total latency
+# percentiles, to size instances.
+#
+# Usage:
+#   python load_test.py                       # defaults below
+#   LOAD_URL=http://host:8080 LOAD_CONCURRENCY=16 LOAD_DURATION=60 python load_test.py
+
+import asyncio
+import os
+import time
+from collections import Counter
+from typing import List, Optional, Sequence
+
+import aiohttp
+import numpy as np
+
+TEXTS = [
+    "ɡowi dʒɐnətaːwəɡeː, dʰiːwəɹə dʒɐnətaːwəɡeː.",
+    "wɐtu kɐmkəɹuwaːɡeː meː sijəlu ɡ ɹaːmiːjə dʒɐnətaːwəɡeː ɡæʈəlu sɐməɡə kɐʈəjutu kɐɹənəwaː.",
+    "pɐhətə dækwenə obeː bʰaːʃaːw sɐhə aːdaːnə mewələm toːɹaː ʈɐjip kiɹiːmə ɐɹəᵐbənnə.",
+]
+
+
+def _percentiles(values: List[float]) -> str:
+    if not values:
+        return "-"
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return f"p50 {p50:.3f}s p95 {p95:.3f}s p99 {p99:.3f}s"
+
+
+async def run_load(url: str, texts: Sequence[str], concurrency: int = 8, duration: float = 30.0,
+                   requests: Optional[int] = None, phonemes: bool = True,
+                   deadline: Optional[float] = None) -> dict:
+    """Drive the service and return (and print) throughput and latency figures."""
+    statuses: Counter = Counter()
+    ttfb: List[float] = []
+    latency: List[float] = []
+    audio_bytes = 0
+    sent = 0
+    stop_at = time.perf_counter() + duration
+
+    def more() -> bool:
+        return sent < requests if requests is not None else time.perf_counter() < stop_at
+
+    async def client(session: aiohttp.ClientSession) -> None:
+        nonlocal sent, audio_bytes
+        while more():
+            text = texts[sent % len(texts)]
+            sent += 1
+            body = {"text": text, "phonemes": phonemes}
+            if deadline is not None:
+                body["deadline"] = deadline
+            start = time.perf_counter()
+            try:
+                async with session.post(url + "/synthesize", json=body) as r:
+                    first = None
+                    async for chunk in r.content.iter_any():
+                        if first is None:
+                            first = time.perf_counter() - start
+                        audio_bytes += len(chunk) if r.status == 200 else 0
+                    statuses[r.status] += 1
+                    if r.status == 200:
+                        ttfb.append(first if first is not None else time.perf_counter() - start)
+                        latency.append(time.perf_counter() - start)
+                    elif r.status == 503:
+                        # Back off as the service asks
+                        await asyncio.sleep(float(r.headers.get("Retry-After", 1)) / 10)
+            except aiohttp.ClientError as e:
+                statuses[type(e).__name__] += 1
+
+    start = time.perf_counter()
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=None)) as session:
+        await asyncio.gather(*(client(session) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    ok = statuses.get(200, 0)
+    result = {
+        "concurrency": concurrency,
+        "elapsed": elapsed,
+        "statuses": dict(statuses),
+        "ok_per_s": ok / elapsed,
+        "audio_bytes": audio_bytes,
+        "ttfb": ttfb,
+        "latency": latency,
+    }
+    print(f"concurrency {concurrency}: {ok} ok in {elapsed:.1f}s ({ok / elapsed:.2f} req/s), statuses {dict(statuses)}")
+    print(f"  time to first byte: {_percentiles(ttfb)}")
+    print(f"  total latency:      {_percentiles(latency)}")
+    return result
+
+
+if __name__ == "__main__":
+    url = os.environ.get("LOAD_URL", "http://127.0.0.1:8080")
+    levels = [int(c) for c in os.environ.get("LOAD_CONCURRENCY", "1,4,8,16").split(",")]
+    duration = float(os.environ.get("LOAD_DURATION", 30))
+    for concurrency in levels:
+        asyncio.run(run_load(url, TEXTS, concurrency=concurrency, duration=duration))
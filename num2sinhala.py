@@ -72,65 +72,100 @@ class SinhalaNumberConverter:
                 "product_ten_noun": "අනූව", "product_ten_prefix": "අනූ"
             }
         }
-    
+
+        self._build_tables()
+
+    def _build_tables(self) -> None:
+        """Precompute position order and the words of every 1..99 group (call again after editing the dicts)."""
+        self._powers = sorted(self.positions.keys(), reverse=True)
+        # group value -> words, for prefix=False / prefix=True
+        self._group_words = [[""] * 100, [""] * 100]
+        for prefix in (False, True):
+            table = self._group_words[prefix]
+            for divided in range(1, 100):
+                table[divided] = self._small_group(divided, prefix)
+        # 100..999 groups are read like a whole number with last_prefix=True
+        self._hundreds_words = {divided: self.convert(divided, True) for divided in range(100, 1000)}
+
+    def _small_group(self, divided: int, prefix: bool) -> str:
+        """Words for a 1..99 group (without the position word)."""
+        if divided > 19:
+            divided_by_ten = divided // 10
+            moded_by_ten = divided % 10
+            words = ""
+            if moded_by_ten >= 1 or prefix:
+                words += self.numbers[divided_by_ten]["product_ten_prefix"] + ' '
+            else:
+                words += self.numbers[divided_by_ten]["product_ten_noun"]
+            if moded_by_ten >= 1:
+                if prefix:
+                    words += self.numbers[moded_by_ten]["prefix"] + ' '
+                else:
+                    words += self.numbers[moded_by_ten]["noun"]
+            return words
+        if divided > 9:
+            key = "plus_ten_prefix" if prefix else "plus_ten_noun"
+            return self.numbers[divided % 10][key] + (' ' if prefix else '')
+        if prefix:
+            return self.numbers[divided]["prefix"] + ' '
+        return self.numbers[divided]["noun"]
+
     def convert(self, translate_me: int, last_prefix: bool = False) -> str:
         """Convert a number to Sinhala text"""
         if translate_me == 0:
             return self.numbers[0]["noun"]
-        
-        translated = ""
-        powers = sorted(self.positions.keys(), reverse=True)
-        last_moded_index = 0
-        
-        while translate_me > 0:
-            position = self.positions[powers[last_moded_index]]
-            power_of_ten = position["power_of_ten"]
-            
-            divided = translate_me // (10 ** power_of_ten)
-            moded = translate_me % (10 ** power_of_ten)
-            
-            prefix = last_prefix or (moded != 0 or power_of_ten != 0)
-            translate_me = moded
-            
-            if divided > 99:
-                translated += self.convert(divided, True)
-            elif divided > 19:
-                divided_by_ten = divided // 10
-                moded_by_ten = divided % 10
-                
-                if moded_by_ten >= 1:
-                    translated += self.numbers[divided_by_ten]["product_ten_prefix"] + ' '
-                else:
-                    if prefix:
-                        translated += self.numbers[divided_by_ten]["product_ten_prefix"] + ' '
-                    else:
-                        translated += self.numbers[divided_by_ten]["product_ten_noun"]
-                
-                if moded_by_ten >= 1:
-                    if prefix:
-                        translated += self.numbers[moded_by_ten]["prefix"] + ' '
-                    else:
-                        translated += self.numbers[moded_by_ten]["noun"]
-            
-            elif divided > 9:
-                moded_by_ten = divided % 10
-                if prefix:
-                    translated += self.numbers[moded_by_ten]["plus_ten_prefix"] + ' '
-                else:
-                    translated += self.numbers[moded_by_ten]["plus_ten_noun"]
-            
-            elif divided > 0 and not (divided == 1 and power_of_ten != 0 and moded == 0 and translated == ''):
-                if prefix:
-                    translated += self.numbers[divided]["prefix"] + ' '
-                else:
-                    translated += self.numbers[divided]["noun"]
-            
-            if divided > 0:
-                if moded > 0:
-                    translated += position["prefix"] + ' '
-                else:
-                    translated += position["noun"]
-            
-            last_moded_index += 1
-        
-        return translated.strip()
+        if translate_me < 0:
+            return ""
+
+        # Split the digits once; each position reads its slice of them
+        digits = str(translate_me)
+        length = len(digits)
+        # Digits at index >= last_nonzero are all zero
+        last_nonzero = len(digits.rstrip("0"))
+
+        parts = []
+        started = False
+        end = 0
+        for power_of_ten in self._powers:
+            start, end = end, max(0, length - power_of_ten)
+            if start == end:
+                continue
+            divided = int(digits[start:end])
+            if divided == 0:
+                continue
+            position = self.positions[power_of_ten]
+            moded_nonzero = end < last_nonzero
+            prefix = last_prefix or moded_nonzero or power_of_ten != 0
+
+            if divided > 999:
+                words = self.convert(divided, True)
+            elif divided > 99:
+                words = self._hundreds_words[divided]
+            elif divided == 1 and power_of_ten != 0 and not moded_nonzero and not started:
+                words = ""
+            else:
+                words = self._group_words[prefix][divided]
+
+            position_words = position["prefix"] + ' ' if moded_nonzero else position["noun"]
+            parts.append(words)
+            parts.append(position_words)
+            started = started or bool(words or position_words)
+            if not moded_nonzero:
+                break
+
+        return "".join(parts).strip()
+
+
+if __name__ == "__main__":
+    # Micro-benchmark: random integers of 1..36 digits
+    import random
+    import time
+
+    converter = SinhalaNumberConverter()
+    rng = random.Random(0)
+    values = [rng.randrange(10 ** (d - 1), 10 ** d) for d in (rng.randint(1, 36) for _ in range(100_000))]
+    start = time.perf_counter()
+    for value in values:
+        converter.convert(value)
+    elapsed = time.perf_counter() - start
+    print(f"{len(values)} conversions in {elapsed:.3f}s ({1e6 * elapsed / len(values):.2f} µs each)")
@@ -15,7 +15,7 @@
 from __future__ import annotations
 import re
 import unicodedata
-from typing import List
+from typing import Iterable, List
 
 # -------------------------
 # Lexicon (editable)
@@ -75,8 +75,10 @@ DECIMAL_WORD = "දශම"
 # Separator when composing multi-part words (TTS-friendly spacing is safe).
 SEP = " "
 
-# Regex for detecting numbers (integers, optionally comma grouped, optional decimal)
-NUM_RE = re.compile(r"-?\d{1,3}(?:,\d{3})*(?:\.\d+)?|-?\d+(?:\.\d+)?")
+# Regex for detecting numbers (integers, optionally comma grouped, optional decimal).
+# The comma-grouped branch needs at least one group, otherwise it would stop
+# plain numbers after three digits ("2025" -> "202" + "5").
+NUM_RE = re.compile(r"-?\d{1,3}(?:,\d{3})+(?:\.\d+)?|-?\d+(?:\.\d+)?")
 
 # -------------------------
 # Helpers
@@ -126,32 +128,45 @@ def _small_to_words(n: int) -> str:
                 parts.append(str(tens))
     return SEP.join(parts) if parts else SMALL[0]
 
+# -------------------------
+# Precomputed tables (built once at import from the lexicon above)
+# -------------------------
+# Words for every 0..999 value
+SMALL_WORDS: List[str] = [_small_to_words(n) for n in range(1000)]
+
+# "<count> <label>" for every scale and count 0..999; count 1 is the bare
+# label (e.g. 'ලක්ෂ' rather than 'එක් ලක්ෂ')
+SCALE_WORDS: List[List[str]] = [
+    [label] * 2 + [SMALL_WORDS[count] + SEP + label for count in range(2, 1000)]
+    for _, label in SCALES
+]
+
 def _compose_spoken_integer(n: int) -> str:
     """Compose a spoken Sinhala string for non-negative integer n using SCALES.
        Uses space-separated components for reliability in TTS. """
     if n == 0:
         return SMALL[0]
+    if n < 1000:
+        return SMALL_WORDS[n]
 
     parts: List[str] = []
     remaining = n
 
-    for val, label in SCALES:
+    for (val, label), scale_words in zip(SCALES, SCALE_WORDS):
         if remaining >= val:
             count = remaining // val
             remaining = remaining % val
 
-            # for scales other than 100 we show "<count> <label>" but collapse when count==1
-            if count == 1:
-                # prefer the bare label (e.g., 'ලක්ෂ' rather than 'එක් ලක්ෂ')
-                parts.append(label)
+            if count < 1000:
+                parts.append(scale_words[count])
             else:
-                # use small-to-words for the count (e.g., 'දෙ ලක්ෂ' or 'දෙලක්ෂ' if you prefer no space)
-                count_words = _small_to_words(count)
-                parts.append(count_words + SEP + label)
+                # counts above 999 only happen for the largest scale
+                # (e.g. 12345 කෝටි); read the count itself with the scales
+                parts.append(_compose_spoken_integer(count) + SEP + label)
 
     # leftover < 100 or <1000 after scales
     if remaining:
-        parts.append(_small_to_words(remaining))
+        parts.append(SMALL_WORDS[remaining])
 
     return SEP.join(parts)
 
@@ -229,6 +244,19 @@ def number_to_sinhala(number_token: str | int | float, mode: str = "spoken") ->
 
     return words
 
+def numbers_to_sinhala(values: Iterable[str | int | float], mode: str = "spoken") -> List[str]:
+    """
+    Expand a whole column of numbers (list, NumPy array, pandas Series, ...)
+    in one call. Each distinct value is expanded once, so repeated years,
+    counts and prices cost a dictionary lookup.
+    """
+    if mode not in {"spoken", "digit_by_digit"}:
+        raise ValueError("mode must be 'spoken' or 'digit_by_digit'")
+    values = list(values)
+    words = {v: number_to_sinhala(v, mode=mode) for v in dict.fromkeys(values)}
+    # NaN never equals itself, so it can miss the table; expand it directly
+    return [words[v] if v in words else number_to_sinhala(v, mode=mode) for v in values]
+
 def replace_numbers_in_text(text: str, mode: str = "spoken") -> str:
     """Replace numeric tokens in `text` with their Sinhala word expansions."""
     text = unicodedata.normalize("NFC", text)
@@ -246,7 +274,7 @@ if __name__ == "__main__":
     examples = [
         "2025", "0", "15", "25", "100", "101", "110", "999",
         "1000", "2000", "12500", "100000", "2500000", "3.14", "-42",
-        "1,234,567", "2025 දින"
+        "1,234,567", "2025 දින", "123456789012"
     ]
     print("spoken mode:")
     for ex in examples:
@@ -254,3 +282,11 @@ if __name__ == "__main__":
     print("\ndigit_by_digit:")
     for ex in examples:
         print(f"{ex} -> {number_to_sinhala(ex, mode='digit_by_digit')}")
+    print("\nbatch:")
+    print(numbers_to_sinhala([2025, 2025, 15, 100000]))
+
+    # Counts of the largest scale above 999 (12345 කෝටි) compose recursively
+    account = replace_numbers_in_text("ගිණුම් අංකය 123456789012")
+    assert not any(ch.isdigit() for ch in account), account
+    assert account.count("කෝටි") == 1, account
+    print(f"\n[✓] {account}")
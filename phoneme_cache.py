@@ -0,0 +1,269 @@
+# phoneme_cache.py
+# Persistent, content-addressed phoneme cache shared by preprocessing,
+# training and inference.
+#
+# - Key: hash of (text exactly as the backend receives it, phonemizer
+#   backend, backend/rule-set version), so a sentence is phonemized once per
+#   pipeline version and a rule or lexicon change simply misses instead of
+#   serving stale IPA.
+# - Format: 256 append-only shard logs (<root>/<xx>.log, xx = first key
+#   byte), one "key<TAB>ipa" line per entry. Each entry is written with a
+#   single O_APPEND write, so any number of processes can add entries to the
+#   same cache at once; readers only consume complete lines.
+# - Eviction: when the logs outgrow `max_bytes`, every shard keeps only its
+#   newest entries (oldest written are dropped first) until the cache is back
+#   under `EVICT_TARGET` of the limit. An entry lost to a concurrent rewrite
+#   is only a future cache miss.
+# - Memory: entries are read shard by shard on demand, and at most
+#   `memory_shards` shards are held (least recently used dropped first), so
+#   a long-running server holds about memory_shards / NUM_SHARDS of the
+#   logs, not everything it has ever seen.
+#
+# Root directory: PhonemeCache(root) or $SINHALA_PHONEME_CACHE
+# (default "phoneme_cache/").
+
+import hashlib
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence
+
+CACHE_DIR_ENV = "SINHALA_PHONEME_CACHE"
+DEFAULT_CACHE_DIR = "phoneme_cache"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_MEMORY_SHARDS = 32
+EVICT_TARGET = 0.8
+NUM_SHARDS = 256
+
+_OPEN_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, "O_BINARY", 0)
+
+
+def normalize_for_key(text: str) -> str:
+    """NFC with runs of whitespace collapsed, so trivially different copies share an entry."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(text: str, backend: str, version: str) -> str:
+    # The exact text: backends keep whitespace runs (and may not NFC), so
+    # "a  b" and "a b" can phonemize differently
+    h = hashlib.blake2b(digest_size=16)
+    for part in (backend, version, text):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class PhonemeCache:
+    """Read-through cache of text -> IPA backed by sharded append-only logs."""
+
+    def __init__(self, root: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES,
+                 memory_shards: int = DEFAULT_MEMORY_SHARDS):
+        self.root = root or os.environ.get(CACHE_DIR_ENV) or DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        self.memory_shards = max(1, memory_shards)
+        os.makedirs(self.root, exist_ok=True)
+        # Per loaded shard (LRU order): entries read so far, bytes consumed and file identity
+        self._shards: "OrderedDict[int, Dict[str, str]]" = OrderedDict()
+        self._offsets: Dict[int, int] = {}
+        self._inodes: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._written = 0
+        self.hits = 0
+        self.misses = 0
+        self.evict()
+
+    def _path(self, shard: int) -> str:
+        return os.path.join(self.root, f"{shard:02x}.log")
+
+    def _forget(self, shard: int) -> None:
+        self._shards.pop(shard, None)
+        self._offsets.pop(shard, None)
+        self._inodes.pop(shard, None)
+
+    def _loaded(self, shard: int) -> Dict[str, str]:
+        """Entries held for a shard, marking it recently used (caller holds the lock)."""
+        entries = self._shards.get(shard)
+        if entries is not None:
+            self._shards.move_to_end(shard)
+            return entries
+        entries = self._shards[shard] = {}
+        while len(self._shards) > self.memory_shards:
+            self._forget(next(iter(self._shards)))
+        return entries
+
+    def _refresh(self, shard: int) -> Dict[str, str]:
+        """Read entries appended to the shard since the last refresh (caller holds the lock)."""
+        entries = self._loaded(shard)
+        path = self._path(shard)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return entries
+        offset = self._offsets.get(shard, 0)
+        if self._inodes.get(shard) != st.st_ino or st.st_size < offset:
+            # Rewritten by eviction: start over
+            entries.clear()
+            offset = 0
+        if st.st_size > offset:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                data = f.read()
+            end = data.rfind(b"\n") + 1
+            # Records end in b"\n" only; str.splitlines() would also break on
+            # U+2028, U+0085, \x0c, ... inside an IPA value
+            for record in data[:end - 1].split(b"\n") if end else ():
+                key, _, ipa = record.decode("utf-8").partition("\t")
+                entries[key] = ipa
+            offset += end
+        self._offsets[shard] = offset
+        self._inodes[shard] = st.st_ino
+        return entries
+
+    def get(self, text: str, backend: str, version: str) -> Optional[str]:
+        key = cache_key(text, backend, version)
+        shard = int(key[:2], 16)
+        with self._lock:
+            ipa = self._loaded(shard).get(key)
+            if ipa is None:
+                ipa = self._refresh(shard).get(key)
+            if ipa is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return ipa
+
+    def put(self, text: str, backend: str, version: str, ipa: str) -> None:
+        if "\n" in ipa or "\t" in ipa:
+            return
+        key = cache_key(text, backend, version)
+        shard = int(key[:2], 16)
+        record = f"{key}\t{ipa}\n".encode("utf-8")
+        fd = os.open(self._path(shard), _OPEN_FLAGS)
+        try:
+            os.write(fd, record)
+        finally:
+            os.close(fd)
+        with self._lock:
+            self._loaded(shard)[key] = ipa
+            self._written += len(record)
+            full = self._written > self.max_bytes // NUM_SHARDS
+            if full:
+                self._written = 0
+        if full:
+            self.evict()
+
+    def phonemize(self, texts: Sequence[str], backend: str, version: str,
+                  phonemize_fn: Callable[[List[str]], List[str]]) -> List[str]:
+        """IPA for every text; only the misses are passed (once each) to `phonemize_fn`."""
+        out: List[Optional[str]] = [self.get(text, backend, version) for text in texts]
+        missing = list(dict.fromkeys(text for text, ipa in zip(texts, out) if ipa is None))
+        if missing:
+            computed = dict(zip(missing, phonemize_fn(missing)))
+            for text, ipa in computed.items():
+                self.put(text, backend, version, ipa)
+            out = [computed[text] if ipa is None else ipa for text, ipa in zip(texts, out)]
+        return out
+
+    def size_bytes(self) -> int:
+        total = 0
+        for shard in range(NUM_SHARDS):
+            try:
+                total += os.path.getsize(self._path(shard))
+            except FileNotFoundError:
+                pass
+        return total
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """Trim the oldest entries of every shard if the cache exceeds `max_bytes`; returns bytes freed."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        total = self.size_bytes()
+        if total <= max_bytes:
+            return 0
+        keep_fraction = EVICT_TARGET * max_bytes / total
+        freed = 0
+        for shard in range(NUM_SHARDS):
+            path = self._path(shard)
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                continue
+            data = data[:data.rfind(b"\n") + 1]
+            budget = int(len(data) * keep_fraction)
+            # Keep the newest whole lines that fit in the budget
+            cut = data.find(b"\n", len(data) - budget - 1) + 1 if budget else len(data)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data[cut:])
+            os.replace(tmp_path, path)
+            freed += cut
+            with self._lock:
+                self._forget(shard)
+        print(f"[✓] Phoneme cache evicted {freed / 1e6:.1f} MB → {self.root}")
+        return freed
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "root": self.root,
+            "bytes": self.size_bytes(),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "memory_shards": len(self._shards),
+            "memory_entries": sum(len(entries) for entries in self._shards.values()),
+        }
+
+
+_default_cache: Optional[PhonemeCache] = None
+
+
+def coqui_cache_dir() -> str:
+    """Directory for Coqui's own per-sample phoneme cache (config.phoneme_cache_path)."""
+    return os.path.join(os.environ.get(CACHE_DIR_ENV) or DEFAULT_CACHE_DIR, "coqui")
+
+
+def get_cache() -> PhonemeCache:
+    """Process-wide cache at $SINHALA_PHONEME_CACHE (or phoneme_cache/)."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = PhonemeCache()
+    return _default_cache
+
+
+class CachedPhonemizer:
+    """
+    Wraps a Coqui TTS phonemizer so TTSTokenizer reads through the cache.
+    Keyed by the phonemizer's name and version plus the separator/language.
+    """
+
+    def __init__(self, phonemizer, cache: Optional[PhonemeCache] = None):
+        self.phonemizer = phonemizer
+        self.cache = cache or get_cache()
+        self.backend = "coqui-" + phonemizer.name()
+        self.version = str(phonemizer.version())
+
+    def phonemize(self, text: str, separator: str = "|", language: str = None) -> str:
+        variant = f"{self.version}:{separator}:{language}"
+        ipa = self.cache.get(text, self.backend, variant)
+        if ipa is None:
+            ipa = self.phonemizer.phonemize(text, separator=separator, language=language)
+            self.cache.put(text, self.backend, variant, ipa)
+        return ipa
+
+    def __getattr__(self, name):
+        return getattr(self.phonemizer, name)
+
+
+def attach_phoneme_cache(tokenizer, cache: Optional[PhonemeCache] = None) -> None:
+    """Make a TTSTokenizer that phonemizes on the fly read through the cache."""
+    phonemizer = getattr(tokenizer, "phonemizer", None)
+    if phonemizer is not None and not isinstance(phonemizer, CachedPhonemizer):
+        tokenizer.phonemizer = CachedPhonemizer(phonemizer, cache)
+
+
+if __name__ == "__main__":
+    cache = get_cache()
+    print(cache.stats())
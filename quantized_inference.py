@@ -0,0 +1,216 @@
+# quantized_inference.py
+# Opt-in reduced-precision CPU inference, selected per model load:
+#
+#   get_synthesizer(..., mode="int8")     # tts_inference.py
+#
+# - "fp32": the models as trained.
+# - "int8": dynamic int8 quantization of the Tacotron2 decoder (attention and
+#   decoder LSTMCells, prenet, attention, projection and stopnet Linears).
+#   The decoder runs once per output frame and dominates Tacotron2 time.
+#   The encoder stays fp32: it runs once per sentence, and Coqui calls
+#   flatten_parameters() on its LSTM, which quantized LSTMs do not have.
+#   The HiFi-GAN generator is all convolutions, which dynamic quantization
+#   does not cover, so it is traced, frozen and run through
+#   torch.jit.optimize_for_inference instead (constant folding, conv/bias and
+#   conv/activation fusion, prepacked oneDNN weights).
+#
+# benchmark() runs each mode in a fresh process over a fixed Sinhala sentence
+# set and reports real-time factor, peak memory and mel-cepstral distortion
+# (MCD) against the fp32 output:
+#   TTS_MODEL_PATH=... TTS_CONFIG_PATH=... VOCODER_MODEL_PATH=... \
+#   VOCODER_CONFIG_PATH=... python quantized_inference.py
+
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import torch
+
+MODES = ("fp32", "int8")
+
+TEST_SENTENCES = [
+    "ආයුබෝවන්, ඔබට කොහොමද?",
+    "අද කාලගුණය ඉතා හොඳයි.",
+    "ශ්‍රී ලංකාව ඉන්දියන් සාගරයේ පිහිටි දූපතකි.",
+    "මම පොතක් කියවමින් සිටිමි.",
+    "දුම්රිය උදේ අට හමාරට පිටත් වේ.",
+    "අපි හෙට පාසලට යමු.",
+    "ඔබගේ දුරකථන අංකය කුමක්ද?",
+    "කොළඹ නගරයේ ජනගහනය ලක්ෂ හයකට වඩා වැඩිය.",
+]
+
+
+# -------------------------
+# Model conversion
+# -------------------------
+def quantize_tacotron2(model):
+    """Dynamic int8 quantization of the decoder's LSTMCell and Linear layers, in place."""
+    torch.ao.quantization.quantize_dynamic(
+        model.decoder, {torch.nn.LSTMCell, torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return model
+
+
+class FusedGenerator(torch.nn.Module):
+    """Frozen TorchScript HiFi-GAN generator with the inference() API of Coqui's generators."""
+
+    def __init__(self, scripted, inference_padding: int):
+        super().__init__()
+        self.scripted = scripted
+        self.inference_padding = inference_padding
+
+    def forward(self, c):
+        return self.scripted(c)
+
+    @torch.no_grad()
+    def inference(self, c):
+        c = torch.nn.functional.pad(c, (self.inference_padding, self.inference_padding), "replicate")
+        return self.scripted(c)
+
+
+def fuse_vocoder(vocoder_model, num_mels: int):
+    """Replace a Coqui GAN vocoder's generator (weight norm already removed) with a frozen, optimized trace."""
+    generator = vocoder_model.model_g.eval()
+    example = torch.randn(1, num_mels, 64)
+    with torch.no_grad():
+        traced = torch.jit.trace(generator, example, check_trace=False)
+    scripted = torch.jit.optimize_for_inference(torch.jit.freeze(traced))
+    vocoder_model.model_g = FusedGenerator(scripted, getattr(generator, "inference_padding", 0))
+    return vocoder_model
+
+
+def apply_mode(synthesizer, mode: str):
+    """Convert a loaded CPU Synthesizer to `mode` (one of MODES)."""
+    if mode not in MODES:
+        raise ValueError(f"Unknown inference mode {mode!r}; expected one of {MODES}")
+    if mode != "fp32":
+        if synthesizer.use_cuda:
+            raise ValueError(f"Inference mode {mode!r} is CPU only")
+        quantize_tacotron2(synthesizer.tts_model)
+        if synthesizer.vocoder_model is not None:
+            fuse_vocoder(synthesizer.vocoder_model, synthesizer.vocoder_config.audio["num_mels"])
+    # Part of audio_cache.synthesizer_fingerprint(): int8 audio is not fp32 audio
+    synthesizer.inference_mode = mode
+    return synthesizer
+
+
+# -------------------------
+# Quality
+# -------------------------
+def mel_cepstral_distortion(reference: np.ndarray, other: np.ndarray, sample_rate: int,
+                            n_mfcc: int = 25) -> float:
+    """
+    MCD in dB between two waveforms: mel cepstra (c0 dropped) aligned with
+    DTW, since the two decoders may stop on different frames.
+    """
+    import librosa
+
+    def cepstra(wav: np.ndarray) -> np.ndarray:
+        mfcc = librosa.feature.mfcc(y=wav.astype(np.float32), sr=sample_rate, n_mfcc=n_mfcc, n_mels=80)
+        # librosa works in dB of power; convert to natural-log amplitude cepstra
+        return mfcc[1:] * math.log(10) / 20
+
+    x, y = cepstra(reference), cepstra(other)
+    _, path = librosa.sequence.dtw(X=x, Y=y, metric="euclidean")
+    diff = x[:, path[:, 0]] - y[:, path[:, 1]]
+    return float(np.mean(10 / math.log(10) * np.sqrt(2 * np.sum(diff ** 2, axis=0))))
+
+
+# -------------------------
+# Benchmark
+# -------------------------
+def _peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:  # Windows
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 2**20
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def _run_mode(mode: str, tts_checkpoint: str, tts_config: Optional[str], vocoder_checkpoint: Optional[str],
+              vocoder_config: Optional[str], texts_path: str, out_path: str) -> None:
+    """Runs in a fresh interpreter: synthesize the texts in one mode, save the audio, print stats as JSON."""
+    from streaming_tts import StreamingSynthesizer
+    from tts_inference import load_synthesizer, warm_up
+
+    synthesizer = load_synthesizer(tts_checkpoint, tts_config, vocoder_checkpoint, vocoder_config, mode=mode)
+    warm_up(synthesizer)
+    streaming = StreamingSynthesizer(synthesizer, frontend=None)
+    with open(texts_path, encoding="utf-8") as f:
+        texts = json.load(f)
+
+    decode_s = vocode_s = 0.0
+    wavs = {}
+    for i, text in enumerate(texts):
+        # Same seed in every mode: prenet dropout may be on at inference
+        torch.manual_seed(i)
+        start = time.perf_counter()
+        mel = streaming.decode(text)
+        decode_s += time.perf_counter() - start
+        start = time.perf_counter()
+        wavs[f"wav_{i}"] = streaming.vocode(mel)
+        vocode_s += time.perf_counter() - start
+    np.savez(out_path, **wavs)
+
+    audio_s = sum(len(w) for w in wavs.values()) / synthesizer.output_sample_rate
+    print(json.dumps({
+        "mode": mode,
+        "sample_rate": synthesizer.output_sample_rate,
+        "audio_s": audio_s,
+        "rtf": (decode_s + vocode_s) / audio_s,
+        "decode_rtf": decode_s / audio_s,
+        "vocode_rtf": vocode_s / audio_s,
+        "peak_mb": _peak_rss_mb(),
+    }))
+
+
+def benchmark(tts_checkpoint: str, tts_config: Optional[str] = None, vocoder_checkpoint: Optional[str] = None,
+              vocoder_config: Optional[str] = None, sentences: Sequence[str] = TEST_SENTENCES,
+              modes: Sequence[str] = MODES) -> Dict[str, dict]:
+    """RTF, peak memory and MCD vs fp32 for each mode, each mode in its own process."""
+    from streaming_tts import default_frontend
+
+    texts = [default_frontend(s) for s in sentences]
+    results: Dict[str, dict] = {}
+    wavs: Dict[str, List[np.ndarray]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        texts_path = os.path.join(tmp, "texts.json")
+        with open(texts_path, "w", encoding="utf-8") as f:
+            json.dump(texts, f, ensure_ascii=False)
+        for mode in ("fp32",) + tuple(m for m in modes if m != "fp32"):
+            out_path = os.path.join(tmp, f"{mode}.npz")
+            args = [mode, tts_checkpoint, tts_config, vocoder_checkpoint, vocoder_config, texts_path, out_path]
+            code = f"import quantized_inference; quantized_inference._run_mode(*{args!r})"
+            proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                                  cwd=os.path.dirname(os.path.abspath(__file__)))
+            results[mode] = json.loads(proc.stdout.strip().splitlines()[-1])
+            with np.load(out_path) as data:
+                wavs[mode] = [data[f"wav_{i}"] for i in range(len(texts))]
+
+    sample_rate = results["fp32"]["sample_rate"]
+    for mode, result in results.items():
+        result["mcd_db"] = float(np.mean([
+            mel_cepstral_distortion(ref, wav, sample_rate) for ref, wav in zip(wavs["fp32"], wavs[mode])]))
+
+    print(f"{len(texts)} sentences, {results['fp32']['audio_s']:.1f}s of fp32 audio")
+    print(f"{'mode':<6} {'RTF':>7} {'decode':>7} {'vocode':>7} {'peak RSS':>10} {'MCD':>8}")
+    for mode, r in results.items():
+        print(f"{mode:<6} {r['rtf']:7.3f} {r['decode_rtf']:7.3f} {r['vocode_rtf']:7.3f} "
+              f"{r['peak_mb']:8.0f}MB {r['mcd_db']:6.2f}dB")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark(
+        os.environ["TTS_MODEL_PATH"],
+        os.environ.get("TTS_CONFIG_PATH"),
+        os.environ.get("VOCODER_MODEL_PATH"),
+        os.environ.get("VOCODER_CONFIG_PATH"),
+    )
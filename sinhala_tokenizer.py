@@ -0,0 +1,145 @@
+# sinhala_tokenizer.py
+# TTSTokenizer variants for the Sinhala symbol table in symbols.py.
+#
+# - SymbolCharacters: vocabulary with one ID per SINHALA_IPA_CHARS entry.
+#   Set config.characters.characters_class = "sinhala_tokenizer.SymbolCharacters"
+#   to train with it (a new model: the embedding table changes size).
+# - SymbolTokenizer: encodes by longest match over the vocabulary, so
+#   multi-character symbols become one input step. With a plain character
+#   vocabulary it encodes like TTSTokenizer, except that the g2p phonemes
+#   without a symbol (v, c) are written as their symbols.PHONEME_SYMBOLS
+#   instead of being dropped, as in the precomputed training IDs.
+#   Sinhala-script input is run through g2p and encoded token by token, so
+#   compound symbols ("ru", "ai", "mb", ...) match what
+#   g2p.convert_metadata(multichar=True) wrote for training; an IPA string
+#   has no phoneme boundaries and never yields them.
+# - PrecomputedIdsTokenizer: returns IDs precomputed by g2p.convert_metadata().
+
+import os
+import re
+from dataclasses import replace
+from typing import Dict, List, Optional
+
+import numpy as np
+from TTS.tts.utils.text.characters import BaseCharacters
+from TTS.tts.utils.text.tokenizer import TTSTokenizer
+
+import symbols
+
+_SINHALA_RE = re.compile("[\u0d80-\u0dff]")
+
+
+class SymbolCharacters(BaseCharacters):
+    """Characters class whose vocabulary is symbols.MULTICHAR_VOCAB."""
+
+    def __init__(self, characters: str = symbols.CHARACTERS, punctuations: str = symbols.PUNCTUATION,
+                 pad: str = symbols.PAD, eos: str = None, bos: str = None, blank: str = None,
+                 is_unique: bool = False, is_sorted: bool = False):
+        super().__init__(characters, punctuations, pad, eos, bos, blank, is_unique, is_sorted)
+
+    def _create_vocab(self):
+        self.vocab = symbols.build_multichar_vocab(pad=self._pad)
+
+    @staticmethod
+    def init_from_config(config):
+        characters = SymbolCharacters()
+        new_config = replace(config, characters=characters.to_config())
+        new_config.characters.characters_class = "sinhala_tokenizer.SymbolCharacters"
+        return characters, new_config
+
+
+class SymbolTokenizer(TTSTokenizer):
+    """TTSTokenizer that encodes by longest match over its (multi-character) vocabulary."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.trie = symbols.SymbolTrie(self.characters.vocab)
+        self.g2p_ids = list(self.characters.vocab) == symbols.MULTICHAR_VOCAB
+
+    @classmethod
+    def from_tokenizer(cls, tokenizer: TTSTokenizer, **kwargs) -> "SymbolTokenizer":
+        return cls(
+            use_phonemes=tokenizer.use_phonemes,
+            text_cleaner=tokenizer.text_cleaner,
+            characters=tokenizer.characters,
+            phonemizer=tokenizer.phonemizer,
+            add_blank=tokenizer.add_blank,
+            use_eos_bos=tokenizer.use_eos_bos,
+            **kwargs,
+        )
+
+    def encode(self, text: str) -> List[int]:
+        if self.g2p_ids and _SINHALA_RE.search(text):
+            import g2p
+
+            return g2p.text_to_symbol_ids(text, multichar=True).tolist()
+        return self.trie.encode(symbols.map_phonemes(text))
+
+    def decode(self, token_ids: List[int]) -> str:
+        return self.trie.decode(token_ids)
+
+
+class PrecomputedIdsTokenizer(SymbolTokenizer):
+    """
+    Tokenizer that returns symbol IDs precomputed by g2p.convert_metadata()
+    for texts it has seen, and falls back to normal tokenization otherwise.
+    """
+
+    def __init__(self, *args, ids_cache: Optional[Dict[str, np.ndarray]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ids_cache = ids_cache or {}
+
+    @classmethod
+    def from_tokenizer(cls, tokenizer: TTSTokenizer, ids_path: str = None) -> "PrecomputedIdsTokenizer":
+        vocab = list(tokenizer.characters.vocab)
+        if ids_path and os.path.exists(ids_path):
+            ids_cache = symbols.load_ids_cache(ids_path, vocab)
+        else:
+            ids_cache = {}
+        return super().from_tokenizer(tokenizer, ids_cache=ids_cache)
+
+    def text_to_ids(self, text: str, language: str = None):
+        ids = self.ids_cache.get(symbols.ids_cache_key(text))
+        if ids is None:
+            return super().text_to_ids(text, language=language)
+        ids = ids.tolist()
+        if self.add_blank:
+            ids = self.intersperse_blank_char(ids, True)
+        if self.use_eos_bos:
+            ids = self.pad_with_bos_eos(ids)
+        return ids
+
+
+def attach_symbol_tokenizer(model) -> None:
+    """
+    Give a loaded TTS model a SymbolTokenizer if it was trained on the
+    symbols.py vocabularies (SymbolCharacters, or the character vocabulary).
+    """
+    characters = model.tokenizer.characters
+    if isinstance(model.tokenizer, SymbolTokenizer):
+        return
+    if isinstance(characters, SymbolCharacters) or list(characters.vocab) == symbols.VOCAB:
+        model.tokenizer = SymbolTokenizer.from_tokenizer(model.tokenizer)
+
+
+if __name__ == "__main__":
+    # Training IDs (g2p.convert_metadata(multichar=True)) and the IDs the
+    # server path (StreamingSynthesizer with the default frontend) feeds the
+    # model must be the same, compound symbols included
+    import types
+
+    import g2p
+    from streaming_tts import StreamingSynthesizer
+
+    tokenizer = SymbolTokenizer(use_phonemes=False, text_cleaner=None, characters=SymbolCharacters())
+    synthesizer = types.SimpleNamespace(tts_model=types.SimpleNamespace(tokenizer=tokenizer))
+    streaming = StreamingSynthesizer(synthesizer)
+    sentence = "කෘෂිකර්මය ශ්‍රී ලංකාවේ ප්‍රධාන ජීවනෝපාය වේ."
+
+    _, (tokens,) = g2p.convert_batch([sentence], return_tokens=True)
+    training_ids = g2p.tokens_to_symbol_ids(tokens, multichar=True).tolist()
+    (served,) = streaming.split(sentence)
+    server_ids = tokenizer.encode(streaming.model_input(served))
+    assert server_ids == training_ids, (tokenizer.decode(server_ids), tokenizer.decode(training_ids))
+    assert any(i in symbols.MULTICHAR_TRIE.compound_ids for i in server_ids)
+    print(f"[✓] {len(server_ids)} IDs match the training IDs: {tokenizer.decode(server_ids)}")
@@ -0,0 +1,452 @@
+# streaming_tts.py
+# Streaming long-form synthesis on top of a Coqui Synthesizer.
+#
+# The text is normalized as a whole (so "Rs. 1,500" or "පෙ.ව. 10.30" are
+# read before any period can end a sentence), split into sentences
+# (Sinhala-aware: ., ?, !, ෴, ¶ and line breaks, but not after initials and
+# known abbreviations) and pushed through three pipelined stages:
+#
+#   front-end (G2P) -> Tacotron2 decoding -> vocoding
+#
+# A model on the multi-character symbol vocabulary gets the normalized
+# Sinhala text instead of IPA: its tokenizer runs g2p and encodes token by
+# token, like the IDs it was trained on (g2p.convert_metadata(multichar=True)).
+#
+# Each stage runs in its own thread and hands its result to the next one
+# through a small bounded queue, so sentence N+1 is phonemized and decoded
+# while sentence N is being vocoded (PyTorch releases the GIL inside its
+# ops). stream() yields float32 audio chunks as soon as they are vocoded
+# (one per sentence, or one per vocoder window with vocoder_chunk_frames, see
+# chunked_vocoder.py) and records time-to-first-audio (TTFA) and real-time
+# factor (RTF) in `last_stats`.
+#
+# With an audio_cache.AudioCache, a sentence synthesized before skips every
+# stage, and with cache_mels a cached mel skips the decoder.
+#
+# Usage:
+#   tts = StreamingSynthesizer(synthesizer)
+#   for chunk in tts.stream(long_sinhala_text):
+#       play(chunk)
+#   print(tts.last_stats)
+
+import queue
+import re
+import threading
+import time
+import types
+import wave
+from typing import Callable, Iterator, List, Optional
+
+import numpy as np
+
+# Sentence ends: Latin punctuation, the Sinhala kunddaliya (෴), pilcrow and newlines
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?෴¶])\s+|\s*\n+\s*")
+# Secondary break points for sentences that are too long to decode in one go
+_CLAUSE_END_RE = re.compile(r"(?<=[,;:])\s+")
+# A period after these ends a word, not a sentence: Latin initials, titles,
+# and the Sinhala a.m./p.m./era abbreviations
+_ABBREVIATION_RE = re.compile(
+    r"(?:^|\s)(?:[A-Z]|Dr|Mr|Mrs|Ms|Prof|St|No|Rs|පෙ\.ව|ප\.ව|ක්\u200dරි\.ව|ක්\u200dරි\.පූ)\.$")
+
+_DONE = object()
+_END_OF_SENTENCE = object()
+
+# Tacotron2 keeps its decoder and attention state on the module during
+# inference, so decoding with one model is serialized across threads
+_model_locks: dict = {}
+_model_locks_guard = threading.Lock()
+
+
+def model_lock(model) -> threading.Lock:
+    """The lock that every thread decoding with `model` must hold."""
+    with _model_locks_guard:
+        return _model_locks.setdefault(id(model), threading.Lock())
+
+
+def split_sentences(text: str, max_chars: int = 300) -> List[str]:
+    """Split text into sentences; sentences over `max_chars` are split again at clause punctuation."""
+    pieces: List[str] = []
+    for piece in _SENTENCE_END_RE.split(text):
+        piece = piece.strip()
+        if not piece:
+            continue
+        if pieces and _ABBREVIATION_RE.search(pieces[-1]):
+            pieces[-1] = f"{pieces[-1]} {piece}"
+        else:
+            pieces.append(piece)
+
+    sentences = []
+    for sentence in pieces:
+        if len(sentence) <= max_chars:
+            sentences.append(sentence)
+            continue
+        current = ""
+        for clause in _CLAUSE_END_RE.split(sentence):
+            if current and len(current) + 1 + len(clause) > max_chars:
+                sentences.append(current)
+                current = clause
+            else:
+                current = f"{current} {clause}" if current else clause
+        if current:
+            sentences.append(current)
+    return sentences
+
+
+def normalize_text(text: str) -> str:
+    """Read numbers, dates, currency amounts, ... as Sinhala words."""
+    import text_normalizer
+
+    return text_normalizer.normalize(text)
+
+
+def phonemize_sentence(sentence: str) -> str:
+    """Phonemize normalized text through the shared phoneme cache."""
+    import text_phonemizer
+
+    return text_phonemizer.phonemize_texts([sentence])[0]
+
+
+def default_frontend(sentence: str) -> str:
+    """
+    Normalize and phonemize one sentence. StreamingSynthesizer splits this
+    in two: it normalizes the whole text first and phonemizes each sentence.
+    """
+    return phonemize_sentence(normalize_text(sentence))
+
+
+def reads_sinhala(synthesizer) -> bool:
+    """
+    True if the model's tokenizer encodes Sinhala text through g2p tokens
+    (sinhala_tokenizer.SymbolTokenizer on the multi-character vocabulary):
+    it must get Sinhala text, since an IPA string never yields the compound
+    symbols it was trained on.
+    """
+    tokenizer = getattr(getattr(synthesizer, "tts_model", None), "tokenizer", None)
+    # A phonemizer model would turn the Sinhala text into IPA before encoding
+    return bool(getattr(tokenizer, "g2p_ids", False)) and not getattr(tokenizer, "use_phonemes", False)
+
+
+class _Job:
+    """One sentence travelling through the pipeline."""
+    __slots__ = ("sentence", "key", "text", "mel", "wav", "seconds")
+
+    def __init__(self, sentence: str):
+        self.sentence = sentence
+        self.key: Optional[str] = None
+        self.text: Optional[str] = None
+        self.mel = None
+        self.wav = None
+        self.seconds = 0.0
+
+
+class StreamStats:
+    """Timing of one stream() call."""
+
+    def __init__(self):
+        self.sentences = 0
+        self.audio_seconds = 0.0
+        self.ttfa: Optional[float] = None
+        self.wall_seconds = 0.0
+
+    @property
+    def rtf(self) -> Optional[float]:
+        """Wall-clock seconds per second of audio (< 1 is faster than real time)."""
+        return self.wall_seconds / self.audio_seconds if self.audio_seconds else None
+
+    def as_dict(self) -> dict:
+        return {
+            "sentences": self.sentences,
+            "audio_seconds": self.audio_seconds,
+            "ttfa": self.ttfa,
+            "wall_seconds": self.wall_seconds,
+            "rtf": self.rtf,
+        }
+
+    def __repr__(self) -> str:
+        ttfa = f"{self.ttfa:.3f}s" if self.ttfa is not None else "-"
+        rtf = f"{self.rtf:.3f}" if self.rtf is not None else "-"
+        return (f"StreamStats(sentences={self.sentences}, audio={self.audio_seconds:.2f}s, "
+                f"ttfa={ttfa}, wall={self.wall_seconds:.2f}s, rtf={rtf})")
+
+
+class StreamingSynthesizer:
+    """Sentence-pipelined, generator-based synthesis with a Coqui Synthesizer."""
+
+    def __init__(self, synthesizer, frontend: Optional[Callable[[str], str]] = default_frontend,
+                 max_chars: int = 300, sentence_pause: float = 0.2, queue_size: int = 2,
+                 vocoder_chunk_frames: Optional[int] = None, audio_cache=None,
+                 cache_mels: bool = False):
+        """
+        `frontend` maps a raw sentence to model input text (None: the text is
+        already model input, e.g. IPA). `sentence_pause` seconds of silence
+        follow every sentence but the last. With `vocoder_chunk_frames` the
+        vocoder runs on windows of that many mel frames (on its own device)
+        and every window is yielded as soon as it is ready. `audio_cache` (an
+        audio_cache.AudioCache) caches each sentence's audio, and its mel too
+        with `cache_mels`.
+        """
+        self.synthesizer = synthesizer
+        self.vocoder_chunk_frames = vocoder_chunk_frames
+        self._chunked_vocoder = None
+        self.audio_cache = audio_cache
+        self.cache_mels = cache_mels
+        self._cache_fingerprint: Optional[str] = None
+        self.frontend = frontend
+        # Normalize before splitting: a period inside "Rs. 1,500" or a date
+        # must not end the sentence
+        if frontend is default_frontend:
+            self._normalize, self._sentence_frontend = normalize_text, phonemize_sentence
+            if reads_sinhala(synthesizer):
+                # The tokenizer runs g2p itself, so compound symbols come from
+                # token boundaries exactly as in the training IDs
+                self._sentence_frontend = None
+        else:
+            self._normalize, self._sentence_frontend = None, frontend
+        self.max_chars = max_chars
+        self.sentence_pause = sentence_pause
+        self.queue_size = queue_size
+        self.last_stats = StreamStats()
+
+    @property
+    def sample_rate(self) -> int:
+        return self.synthesizer.output_sample_rate
+
+    # -------------------------
+    # Stages
+    # -------------------------
+    def decode(self, text: str):
+        """Tacotron2 decoding: model input text -> mel spectrogram (or waveform without a vocoder)."""
+        import torch
+        from TTS.tts.utils.synthesis import synthesis
+
+        synth = self.synthesizer
+        use_gl = synth.vocoder_model is None
+        with model_lock(synth.tts_model), torch.no_grad():
+            outputs = synthesis(
+                model=synth.tts_model,
+                text=text,
+                CONFIG=synth.tts_config,
+                use_cuda=synth.use_cuda,
+                use_griffin_lim=use_gl,
+            )
+        if use_gl:
+            return np.asarray(outputs["wav"], dtype=np.float32).squeeze()
+        mel = outputs["outputs"]["model_outputs"][0].detach().cpu().numpy()
+        return synth.tts_model.ap.denormalize(mel.T).T
+
+    def vocode(self, mel):
+        """
+        HiFi-GAN vocoding: denormalized mel (frames x bins) -> waveform, or a
+        generator of waveform chunks with vocoder_chunk_frames.
+        """
+        import torch
+        from TTS.vocoder.utils.generic_utils import interpolate_vocoder_input
+
+        synth = self.synthesizer
+        if synth.vocoder_model is None:
+            # decode() already returned a Griffin-Lim waveform
+            return mel
+        vocoder_input = synth.vocoder_ap.normalize(mel.T)
+        scale = synth.vocoder_config["audio"]["sample_rate"] / synth.tts_model.ap.sample_rate
+        if self.vocoder_chunk_frames:
+            if scale != 1:
+                vocoder_input = interpolate_vocoder_input([1, scale], vocoder_input).squeeze(0).numpy()
+            return self._get_chunked_vocoder().iter_vocode(vocoder_input)
+        if scale != 1:
+            vocoder_input = interpolate_vocoder_input([1, scale], vocoder_input)
+        else:
+            vocoder_input = torch.tensor(vocoder_input).unsqueeze(0)
+        device = "cuda" if synth.use_cuda else "cpu"
+        with torch.no_grad():
+            wav = synth.vocoder_model.inference(vocoder_input.to(device))
+        return wav.cpu().numpy().squeeze().astype(np.float32)
+
+    def _get_chunked_vocoder(self):
+        if self._chunked_vocoder is None:
+            from chunked_vocoder import ChunkedVocoder
+
+            synth = self.synthesizer
+            self._chunked_vocoder = ChunkedVocoder(
+                synth.vocoder_model, synth.vocoder_ap.hop_length, chunk_frames=self.vocoder_chunk_frames)
+        return self._chunked_vocoder
+
+    def _cache_key(self, sentence: str, kind: str) -> str:
+        from audio_cache import audio_key, synthesizer_fingerprint
+
+        if self._cache_fingerprint is None:
+            if self.frontend is None:
+                frontend = "none"
+            elif self.frontend is default_frontend and self._sentence_frontend is None:
+                import g2p
+                frontend = f"g2p-ids:{g2p.pronunciation_version()}"
+            elif self.frontend is default_frontend:
+                import text_phonemizer
+                backend = text_phonemizer.resolve_backend()
+                frontend = f"{backend}:{text_phonemizer.BACKEND_VERSIONS[backend]()}"
+            else:
+                frontend = f"{self.frontend.__module__}.{self.frontend.__qualname__}"
+            self._cache_fingerprint = f"{frontend}|{synthesizer_fingerprint(self.synthesizer)}"
+        phonemizer_version, _, model = self._cache_fingerprint.partition("|")
+        return audio_key(sentence, phonemizer_version, model, kind)
+
+    def _front_stage(self, job: _Job) -> _Job:
+        cache = self.audio_cache
+        if cache is not None:
+            job.key = self._cache_key(job.sentence, "wav")
+            job.wav = cache.get(job.key)
+            if job.wav is not None:
+                return job
+            if self.cache_mels:
+                job.mel = cache.get(self._cache_key(job.sentence, "mel"))
+                if job.mel is not None:
+                    return job
+        start = time.perf_counter()
+        job.text = self.model_input(job.sentence)
+        job.seconds += time.perf_counter() - start
+        return job
+
+    def _decode_stage(self, job: _Job) -> _Job:
+        if job.wav is None and job.mel is None:
+            start = time.perf_counter()
+            job.mel = self.decode(job.text)
+            elapsed = time.perf_counter() - start
+            job.seconds += elapsed
+            if self.audio_cache is not None and self.cache_mels:
+                self.audio_cache.put(self._cache_key(job.sentence, "mel"), job.mel, elapsed)
+        return job
+
+    def _vocode_stage(self, job: _Job):
+        if job.wav is not None:
+            return job.wav
+        if self.audio_cache is None:
+            return self.vocode(job.mel)
+        start = time.perf_counter()
+        result = self.vocode(job.mel)
+        if isinstance(result, types.GeneratorType):
+            return self._cache_chunks(job, result)
+        job.seconds += time.perf_counter() - start
+        self.audio_cache.put(job.key, result, job.seconds)
+        return result
+
+    def _cache_chunks(self, job: _Job, chunks: Iterator[np.ndarray]) -> Iterator[np.ndarray]:
+        """Pass vocoder chunks through and cache the whole sentence once complete."""
+        collected = []
+        while True:
+            start = time.perf_counter()
+            chunk = next(chunks, None)
+            job.seconds += time.perf_counter() - start
+            if chunk is None:
+                break
+            collected.append(chunk)
+            yield chunk
+        self.audio_cache.put(job.key, np.concatenate(collected) if collected else np.zeros(0, np.float32),
+                             job.seconds)
+
+    # -------------------------
+    # Pipeline
+    # -------------------------
+    def model_input(self, sentence: str) -> str:
+        """The text decode() gets for one sentence from split()."""
+        return self._sentence_frontend(sentence) if self._sentence_frontend else sentence
+
+    def split(self, text: str) -> List[str]:
+        """The sentences stream() synthesizes for `text` (normalized first with the default frontend)."""
+        if self._normalize is not None:
+            text = self._normalize(text)
+        return split_sentences(text, self.max_chars)
+
+    def _run_stage(self, fn: Callable, inbox: queue.Queue, outbox: queue.Queue,
+                   stop: threading.Event, last: bool = False) -> None:
+        try:
+            while not stop.is_set():
+                item = inbox.get()
+                if item is _DONE or isinstance(item, BaseException):
+                    outbox.put(item)
+                    return
+                result = fn(item)
+                if not last:
+                    outbox.put(result)
+                    continue
+                # Audio goes out chunk by chunk, followed by a sentence marker
+                for chunk in (result if isinstance(result, types.GeneratorType) else (result,)):
+                    if stop.is_set():
+                        return
+                    outbox.put(chunk)
+                outbox.put(_END_OF_SENTENCE)
+        except BaseException as e:  # handed down to the consumer, re-raised there
+            outbox.put(e)
+
+    def stream(self, text: str) -> Iterator[np.ndarray]:
+        """Yield float32 audio chunks in order, each as soon as it is ready."""
+        stats = self.last_stats = StreamStats()
+        start = time.perf_counter()
+        sentences = self.split(text)
+        if not sentences:
+            return
+
+        stages = [self._front_stage, self._decode_stage, self._vocode_stage]
+        queues = [queue.Queue()] + [queue.Queue(self.queue_size) for _ in stages]
+        stop = threading.Event()
+        threads = [
+            threading.Thread(target=self._run_stage, daemon=True,
+                             args=(fn, queues[i], queues[i + 1], stop, i == len(stages) - 1))
+            for i, fn in enumerate(stages)
+        ]
+        for sentence in sentences:
+            queues[0].put(_Job(sentence))
+        queues[0].put(_DONE)
+        for t in threads:
+            t.start()
+
+        pause = np.zeros(int(self.sentence_pause * self.sample_rate), dtype=np.float32)
+        remaining = len(sentences)
+        try:
+            while remaining:
+                item = queues[-1].get()
+                if isinstance(item, BaseException):
+                    raise item
+                if item is _END_OF_SENTENCE:
+                    remaining -= 1
+                    stats.sentences += 1
+                    if not remaining or not len(pause):
+                        continue
+                    item = pause
+                stats.audio_seconds += len(item) / self.sample_rate
+                if stats.ttfa is None:
+                    stats.ttfa = time.perf_counter() - start
+                stats.wall_seconds = time.perf_counter() - start
+                yield item
+        finally:
+            stop.set()
+            # Unblock stages waiting on a full or an empty queue so the threads can exit
+            for q in queues:
+                while not q.empty():
+                    q.get_nowait()
+                try:
+                    q.put_nowait(_DONE)
+                except queue.Full:
+                    pass
+            stats.wall_seconds = time.perf_counter() - start
+
+    def synthesize_to_file(self, text: str, path: str) -> StreamStats:
+        """Stream `text` into a 16-bit PCM wav file, appending each chunk as it arrives."""
+        with wave.open(path, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(self.sample_rate)
+            for chunk in self.stream(text):
+                pcm = np.clip(chunk, -1.0, 1.0) * 32767
+                f.writeframes(pcm.astype("<i2").tobytes())
+        print(f"[✓] {self.last_stats} → {path}")
+        return self.last_stats
+
+
+if __name__ == "__main__":
+    # Splitting only (no model needed): the currency amount is read before
+    # the period after "Rs." could end a sentence
+    sentences = StreamingSynthesizer(None).split("මිල Rs. 1,500 කි. Dr. පෙරේරා පෙ.ව. 10ට එයි.")
+    for sentence in sentences:
+        print(sentence)
+    assert len(sentences) == 2, sentences
+    assert "රුපියල්" in sentences[0] and not any(ch.isdigit() for ch in sentences[0]), sentences
+    print(f"[✓] {len(sentences)} sentences")
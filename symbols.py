@@ -0,0 +1,264 @@
+# symbols.py
+# Symbol table shared by G2P preprocessing, training and inference.
+#
+# The vocabulary is built exactly the way Coqui's Graphemes class builds it
+# from the "characters" section of tacotron.json (unique + sorted characters,
+# then the punctuation), so IDs produced here are the IDs TTSTokenizer would
+# produce. check_tokenizer() verifies that against a live tokenizer.
+
+import hashlib
+import re
+import unicodedata
+from typing import Dict, List, Optional
+
+import numpy as np
+
+SINHALA_IPA_CHARS = [
+    # Basic vowels (matching the actual phonetic output)
+    'a', 'aː', 'æ', 'æː', 'i', 'iː', 'u', 'uː', 'e', 'eː', 'o', 'oː',
+    # Special vowels
+    'ru', 'ruː', 'li', 'liː',
+    # Additional vowels found in your data
+    'ə', 'ɐ', 'ʊ', 'ɪ',  # schwa, near-open central, near-close near-back rounded, near-close near-front unrounded
+    # Diphthongs
+    'ai', 'au',
+    
+    # Consonants - stops
+    'k', 'kʰ', 'g', 'gʰ', 'ŋ', 'ɡ',  # Added 'ɡ' (script g)
+    't͡ʃ', 't͡ʃʰ', 'd͡ʒ', 'd͡ʒʰ', 'ɲ',
+    'ʈ', 'ʈʰ', 'ɖ', 'ɖʰ', 'ɳ',
+    't̪', 't̪ʰ', 'd̪', 'd̪ʰ', 'n̪',
+    'p', 'pʰ', 'b', 'bʰ', 'm',
+    
+    # Sonorants
+    'j', 'r', 'l', 'w', 'ɭ', 'ɹ',  # Added 'ɹ' (alveolar approximant)
+    
+    # Fricatives
+    'ʃ', 'ʂ', 's', 'h', 'f', 'χ',  # Added 'χ' (voiceless uvular fricative)
+    
+    # Complex/compound consonants
+    'ŋg', 'ɲd͡ʒ', 'ɳɖ', 'n̪d̪', 'mb',
+    'gn',  # for ඥ
+    
+    # Prenasalized consonants (found in your data)
+    'ᵐ', 'ⁿ', 'ᵑ',  # superscript m, n, ng for prenasalization
+    
+    # Special markers for compound sounds
+    'X1', 'X2',  # markers used in the phonetic rules
+    
+    # Numbers
+    '0', '1', '2', '3', '4', '5', '6', '7', '8', '9',
+]
+
+CHARACTERS = "".join(SINHALA_IPA_CHARS)
+# Include ” and ‘ in punctuation"
+PUNCTUATION = ".,!?;:=()-[]\"'“”‘’෴ \n\r\t#"
+
+
+def build_vocab(characters: str = CHARACTERS, punctuations: str = PUNCTUATION,
+                pad: Optional[str] = "", eos: Optional[str] = "", bos: Optional[str] = "",
+                blank: Optional[str] = None) -> List[str]:
+    """Vocabulary in Graphemes order (is_unique=True, is_sorted=True)."""
+    vocab = sorted(set(characters))
+    for special in (blank, bos, eos, pad):
+        if special:
+            vocab = [special] + vocab
+    return vocab + list(punctuations)
+
+
+# g2p phonemes without a symbol of their own, written as the nearest symbol
+# (ව and ච; the vocabulary has w and t͡ʃ, not v and c)
+PHONEME_SYMBOLS: Dict[str, str] = {"v": "w", "c": "t͡ʃ"}
+_PHONEME_SYMBOLS_TABLE = str.maketrans(PHONEME_SYMBOLS)
+
+
+def map_phonemes(ipa: str) -> str:
+    """Replace the PHONEME_SYMBOLS phonemes in an IPA string with their symbols."""
+    return ipa.translate(_PHONEME_SYMBOLS_TABLE)
+
+
+VOCAB = build_vocab()
+# Later entries win, as in Coqui's char_to_id mapping
+SYMBOL_TO_ID: Dict[str, int] = {s: i for i, s in enumerate(VOCAB)}
+SPACE_ID = SYMBOL_TO_ID[" "]
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def clean_text(text: str) -> str:
+    """Same as Coqui's basic_cleaners: lowercase and collapse whitespace."""
+    return _WHITESPACE_RE.sub(" ", text.lower()).strip()
+
+
+def text_to_ids(ipa: str) -> np.ndarray:
+    """
+    Symbol IDs of an IPA string (PHONEME_SYMBOLS mapped); other unknown
+    characters are dropped like TTSTokenizer does.
+    """
+    get = SYMBOL_TO_ID.get
+    ids = [get(ch) for ch in map_phonemes(clean_text(ipa))]
+    return np.asarray([i for i in ids if i is not None], dtype=np.int32)
+
+
+# -------------------------
+# Multi-character symbols
+# -------------------------
+# With the character vocabulary above, "aː", "t͡ʃʰ" or "n̪d̪" cost two to four
+# encoder steps each. The multi-character vocabulary gives every
+# SINHALA_IPA_CHARS entry one ID; SymbolTrie encodes by longest match.
+#
+# Some entries span two phonemes ("ru", "ai", "mb", "n̪d̪", ...), and a plain
+# IPA string cannot tell "ru" from r followed by u. Those compound symbols
+# are only produced from g2p token boundaries (g2p.tokens_to_symbol_ids with
+# multichar=True); longest match over a string stops at phoneme boundaries.
+PAD = "<PAD>"
+
+
+def is_compound_symbol(sym: str) -> bool:
+    """
+    True if `sym` spans more than one phoneme: more than one base letter once
+    combining marks, modifier letters (ː, ʰ) and tie-bar joins are attached
+    to the letter before them.
+    """
+    phonemes = 0
+    joined = False
+    for ch in sym:
+        if unicodedata.combining(ch) or (phonemes and unicodedata.category(ch) == "Lm"):
+            joined = ch == "\u0361"
+            continue
+        if not joined:
+            phonemes += 1
+        joined = False
+    return phonemes > 1
+
+
+def build_multichar_vocab(symbols: List[str] = SINHALA_IPA_CHARS,
+                          punctuations: str = PUNCTUATION, pad: str = PAD) -> List[str]:
+    """
+    Pad first (Tacotron2 uses ID 0 as padding), then every symbol, then any
+    single character of those symbols not already present (so text the
+    character vocabulary could encode still encodes), then the punctuation.
+    """
+    vocab = [pad] if pad else []
+    seen = set(vocab)
+    candidates = list(symbols) + [ch for sym in symbols for ch in sym] + list(punctuations)
+    for sym in candidates:
+        if sym not in seen:
+            seen.add(sym)
+            vocab.append(sym)
+    return vocab
+
+
+class SymbolTrie:
+    """Longest-match encoder from text to the IDs of a (multi-character) vocabulary."""
+
+    def __init__(self, vocab: List[str]):
+        self.vocab = list(vocab)
+        self.root: dict = {}
+        self.compound_ids = frozenset(i for i, sym in enumerate(self.vocab) if is_compound_symbol(sym))
+        self.symbol_to_id: Dict[str, int] = {}
+        for idx, sym in enumerate(self.vocab):
+            self.symbol_to_id.setdefault(sym, idx)
+            node = self.root
+            for ch in sym:
+                node = node.setdefault(ch, {})
+            node[None] = idx
+
+    def encode(self, text: str, compounds: bool = False) -> List[int]:
+        """
+        IDs of the longest symbols covering `text`; characters no symbol
+        starts with are dropped. Compound symbols are only matched with
+        compounds=True, i.e. when `text` is known to be a single phoneme.
+        """
+        ids = []
+        root = self.root
+        skip = frozenset() if compounds else self.compound_ids
+        i, n = 0, len(text)
+        while i < n:
+            node = root
+            best, best_end = None, i + 1
+            j = i
+            while j < n:
+                node = node.get(text[j])
+                if node is None:
+                    break
+                j += 1
+                if None in node and node[None] not in skip:
+                    best, best_end = node[None], j
+            if best is not None:
+                ids.append(best)
+            i = best_end
+        return ids
+
+    def encode_phoneme(self, phoneme: str) -> List[int]:
+        """IDs of one phoneme (a g2p token): its own symbol if it has one, else its parts."""
+        idx = self.symbol_to_id.get(phoneme)
+        return [idx] if idx is not None else self.encode(phoneme, compounds=True)
+
+    def decode(self, ids) -> str:
+        return "".join(self.vocab[i] for i in ids)
+
+
+MULTICHAR_VOCAB = build_multichar_vocab()
+MULTICHAR_TRIE = SymbolTrie(MULTICHAR_VOCAB)
+
+
+def text_to_multichar_ids(ipa: str) -> np.ndarray:
+    """
+    Multi-character symbol IDs of an IPA string (after basic_cleaners),
+    without compound symbols; see g2p.tokens_to_symbol_ids for those.
+    """
+    return np.asarray(MULTICHAR_TRIE.encode(map_phonemes(clean_text(ipa))), dtype=np.int32)
+
+
+def vocab_fingerprint(vocab: List[str]) -> str:
+    return hashlib.sha1("\x00".join(vocab).encode("utf-8")).hexdigest()[:16]
+
+
+def check_tokenizer(tokenizer, vocab: List[str] = VOCAB) -> None:
+    """Raise if a TTSTokenizer's vocabulary differs from `vocab`."""
+    if list(tokenizer.characters.vocab) != list(vocab):
+        raise ValueError(
+            "Tokenizer vocabulary does not match the symbols.py vocabulary; "
+            "precomputed symbol IDs would be misaligned with the model."
+        )
+
+
+# -------------------------
+# Precomputed ID cache (model-ready inputs keyed by metadata text)
+# -------------------------
+_VOCAB_KEY = "_vocab"
+
+
+def ids_cache_key(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def save_ids_cache(path: str, ids_by_text: Dict[str, np.ndarray], vocab: List[str] = VOCAB) -> None:
+    arrays = {ids_cache_key(text): ids for text, ids in ids_by_text.items()}
+    arrays[_VOCAB_KEY] = np.array(vocab_fingerprint(vocab))
+    np.savez(path, **arrays)
+
+
+def load_ids_cache(path: str, vocab: List[str] = VOCAB) -> Dict[str, np.ndarray]:
+    """Load a cache written by save_ids_cache(); raises if it was built for another vocabulary."""
+    with np.load(path) as data:
+        if _VOCAB_KEY in data.files and str(data[_VOCAB_KEY]) != vocab_fingerprint(vocab):
+            raise ValueError(f"{path} was built for a different symbol vocabulary")
+        return {key: data[key] for key in data.files if key != _VOCAB_KEY}
+
+
+if __name__ == "__main__":
+    # Compare encoder input lengths of the two vocabularies on the training metadata
+    import csv
+
+    char_len = symbol_len = rows = 0
+    with open("dataset/phonemized.csv", "r", encoding="utf-8", newline="") as f:
+        for row in csv.reader(f, delimiter="|"):
+            if len(row) >= 3:
+                rows += 1
+                char_len += len(text_to_ids(row[2]))
+                symbol_len += len(text_to_multichar_ids(row[2]))
+    print(f"{rows} sentences: {char_len / max(rows, 1):.1f} character IDs vs "
+          f"{symbol_len / max(rows, 1):.1f} symbol IDs per sentence "
+          f"({100 * (1 - symbol_len / max(char_len, 1)):.1f}% shorter)")
@@ -0,0 +1,56 @@
+# text_frontend.py
+# Single-pass Sinhala text front-end: NFC normalization, number expansion and
+# G2P in one left-to-right scan.
+#
+# Same output as g2p.convert_text(num_to_sinhala.replace_numbers_in_text(text)),
+# but the text is normalized once (skipped entirely when it is already NFC),
+# never copied between stages, and every converted piece goes into a single
+# output buffer that is joined once at the end.
+# Number spans never contain whitespace, so they are always inside one
+# whitespace-delimited word: words without a digit go straight to G2P, words
+# with one are expanded first and their expansion is phonemized word by word.
+
+import re
+import unicodedata
+from typing import List
+
+from g2p import sinhala_to_ipa
+from num_to_sinhala import NUM_RE, number_to_sinhala
+
+_PIECE_RE = re.compile(r"\S+|\s+")
+_DIGIT_RE = re.compile(r"\d")
+
+
+def normalize_nfc(text: str) -> str:
+    """NFC-normalize, skipping the copy when the text is already NFC."""
+    if unicodedata.is_normalized("NFC", text):
+        return text
+    return unicodedata.normalize("NFC", text)
+
+
+def _append_number_word(word: str, mode: str, out: List[str]) -> None:
+    expanded = NUM_RE.sub(lambda m: number_to_sinhala(m.group(0), mode=mode), word)
+    for piece in _PIECE_RE.findall(normalize_nfc(expanded)):
+        out.append(piece if piece[0].isspace() else sinhala_to_ipa(piece))
+
+
+def text_to_ipa(text: str, number_mode: str = "spoken") -> str:
+    """Raw Sinhala text (digits allowed) to IPA in one pass."""
+    if number_mode not in {"spoken", "digit_by_digit"}:
+        raise ValueError("mode must be 'spoken' or 'digit_by_digit'")
+    text = normalize_nfc(text)
+    out: List[str] = []
+    append = out.append
+    for m in _PIECE_RE.finditer(text):
+        piece = m.group()
+        if piece[0].isspace():
+            append(piece)
+        elif _DIGIT_RE.search(piece) is None:
+            append(sinhala_to_ipa(piece))
+        else:
+            _append_number_word(piece, number_mode, out)
+    return "".join(out)
+
+
+if __name__ == "__main__":
+    print(text_to_ipa("අද 2025 දින රත්මලානේ 1,500ක් සහ 3.14 ක් තියනවා."))
@@ -0,0 +1,280 @@
+# text_normalizer.py
+# Semiotic-class normalizer: rewrites dates, times, currency amounts, phone
+# numbers, percentages, ordinals and plain numbers as Sinhala words.
+#
+# Every enabled class contributes one named group to a single alternation
+# regex, so the text is scanned once however many classes are enabled; each
+# match is handed to the verbalizer of the class that matched. Classes are
+# tried in the order of SEMIOTIC_CLASSES at each position, so the specific
+# ones (dates, phone numbers, ...) win over the plain "number" fallback.
+#
+# All classes read numbers with num2sinhala.SinhalaNumberConverter, so a
+# value is spoken the same way whether it is a year, a price or a count.
+#
+# Per-class hit counts and verbalizer time are kept in TextNormalizer.stats().
+#
+# Usage:
+#   normalize("2025-01-15 10:30 ට Rs. 1,500 ක් ගෙවන්න. 0771234567 අමතන්න.")
+
+import re
+import time
+import unicodedata
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from num_to_sinhala import DECIMAL_WORD, NUM_RE, SEP
+from num2sinhala import SinhalaNumberConverter
+
+_converter = SinhalaNumberConverter()
+
+MONTHS = [
+    "ජනවාරි", "පෙබරවාරි", "මාර්තු", "අප්‍රේල්", "මැයි", "ජූනි",
+    "ජූලි", "අගෝස්තු", "සැප්තැම්බර්", "ඔක්තෝබර්", "නොවැම්බර්", "දෙසැම්බර්",
+]
+
+HOUR_WORD = "පැය"
+MINUTE_WORD = "මිනිත්තු"
+SECOND_WORD = "තත්පර"
+PERCENT_WORD = "සියයට"
+PLUS_WORD = "ප්ලස්"
+MINUS_WORD = "මයිනස්"
+FIRST_WORD = "පළමු"
+
+# Longer integers (account numbers, IDs, ...) are read digit by digit
+MAX_SPOKEN_DIGITS = 15
+
+# Currency symbol -> (unit word, cents word)
+CURRENCIES = {
+    "Rs": ("රුපියල්", "ශත"),
+    "රු": ("රුපියල්", "ශත"),
+    "LKR": ("රුපියල්", "ශත"),
+    "$": ("ඩොලර්", "සත"),
+    "USD": ("ඩොලර්", "සත"),
+}
+
+
+class SemioticClass(NamedTuple):
+    name: str
+    pattern: str
+    verbalize: Callable[[re.Match, str], str]
+
+
+# -------------------------
+# Verbalizers (match, number mode) -> words
+# -------------------------
+def _digit_words(digits: str) -> str:
+    return SEP.join(_converter.convert(int(ch)) for ch in digits)
+
+
+def _spoken_int(digits: str, prefix: bool = False) -> str:
+    digits = digits.lstrip("0") or "0"
+    if len(digits) > MAX_SPOKEN_DIGITS:
+        return _digit_words(digits)
+    return _converter.convert(int(digits), prefix)
+
+
+def _read_number(token: str, mode: str) -> str:
+    """Words for an optionally signed, comma-grouped integer or decimal token."""
+    token = token.replace(",", "")
+    negative = token.startswith("-")
+    whole, _, fraction = token.lstrip("-").partition(".")
+    whole = whole or "0"
+    words = _digit_words(whole) if mode == "digit_by_digit" else _spoken_int(whole)
+    if fraction:
+        words = SEP.join([words, DECIMAL_WORD, _digit_words(fraction)])
+    return MINUS_WORD + SEP + words if negative else words
+
+
+def _plain_numbers(span: str, mode: str) -> str:
+    """
+    Fallback for spans that match a class shape but are not valid values:
+    each digit run is read on its own and the separators are kept (so the
+    hyphens of "2025-13-45" are not read as minus signs).
+    """
+    return re.sub(r"\d+", lambda m: _read_number(m.group(0), mode), span)
+
+
+def _verbalize_date(year: str, month: str, day: str, span: str, mode: str) -> str:
+    m, d = int(month), int(day)
+    if not (1 <= m <= 12 and 1 <= d <= 31):
+        return _plain_numbers(span, mode)
+    return SEP.join([_spoken_int(year), MONTHS[m - 1], _spoken_int(day)])
+
+
+def _date_ymd(m: re.Match, mode: str) -> str:
+    return _verbalize_date(m.group("ymd_y"), m.group("ymd_m"), m.group("ymd_d"), m.group(0), mode)
+
+
+def _date_dmy(m: re.Match, mode: str) -> str:
+    return _verbalize_date(m.group("dmy_y"), m.group("dmy_m"), m.group("dmy_d"), m.group(0), mode)
+
+
+def _time(m: re.Match, mode: str) -> str:
+    parts = [HOUR_WORD, _spoken_int(m.group("time_h"))]
+    if int(m.group("time_m")):
+        parts += [MINUTE_WORD, _spoken_int(m.group("time_m"))]
+    if m.group("time_s") and int(m.group("time_s")):
+        parts += [SECOND_WORD, _spoken_int(m.group("time_s"))]
+    return SEP.join(parts)
+
+
+def _currency(m: re.Match, mode: str) -> str:
+    unit, cents_unit = CURRENCIES[m.group("cur_sym")]
+    amount = m.group("cur_amt").replace(",", "")
+    whole, _, cents = amount.partition(".")
+    words = [_read_number(whole or "0", mode), unit]
+    if cents and int(cents):
+        # Two-digit cents: ".5" is fifty cents
+        words += [_read_number(cents[:2].ljust(2, "0"), mode), cents_unit]
+    return SEP.join(words)
+
+
+def _phone(m: re.Match, mode: str) -> str:
+    span = m.group(0)
+    digits = "".join(ch for ch in span if ch.isdigit())
+    words = _digit_words(digits)
+    return (PLUS_WORD + SEP + words) if span.startswith("+") else words
+
+
+def _percent(m: re.Match, mode: str) -> str:
+    return PERCENT_WORD + SEP + _read_number(m.group("pct_num"), mode)
+
+
+def _ordinal(m: re.Match, mode: str) -> str:
+    n = int(m.group("ord_num"))
+    stem = FIRST_WORD if n == 1 else _spoken_int(m.group("ord_num"), prefix=True)
+    return stem + m.group("ord_suffix")
+
+
+def _number(m: re.Match, mode: str) -> str:
+    return _read_number(m.group(0), mode)
+
+
+# -------------------------
+# Class table (order = priority at a given position)
+# -------------------------
+_NB = r"(?<![\d.,:/+-])"  # not inside a longer number
+_NA = r"(?![\d])"
+# Not followed by more of a word (Sinhala vowel signs are not \w, so \b is unreliable)
+_WORD_END = r"(?![\u0D80-\u0DFF\w])"
+_AMOUNT = r"\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?"
+
+SEMIOTIC_CLASSES: List[SemioticClass] = [
+    SemioticClass(
+        "date_ymd",
+        _NB + r"(?P<ymd_y>\d{4})(?P<ymd_sep>[-/.])(?P<ymd_m>\d{1,2})(?P=ymd_sep)(?P<ymd_d>\d{1,2})" + _NA,
+        _date_ymd,
+    ),
+    SemioticClass(
+        "date_dmy",
+        _NB + r"(?P<dmy_d>\d{1,2})(?P<dmy_sep>[-/.])(?P<dmy_m>\d{1,2})(?P=dmy_sep)(?P<dmy_y>\d{4})" + _NA,
+        _date_dmy,
+    ),
+    SemioticClass(
+        "phone",
+        _NB + r"(?:\+94[ -]?|0)7\d[ -]?\d{3}[ -]?\d{4}" + _NA + "|"
+        + _NB + r"(?:\+94[ -]?|0)[1-9]\d[ -]?\d{7}" + _NA,
+        _phone,
+    ),
+    SemioticClass(
+        "time",
+        _NB + r"(?P<time_h>[01]?\d|2[0-3]):(?P<time_m>[0-5]\d)(?::(?P<time_s>[0-5]\d))?" + _NA,
+        _time,
+    ),
+    SemioticClass(
+        "currency",
+        r"(?P<cur_sym>Rs|රු|LKR|USD|\$)\.?\s?(?P<cur_amt>" + _AMOUNT + ")",
+        _currency,
+    ),
+    SemioticClass("percent", _NB + r"(?P<pct_num>" + _AMOUNT + r")\s?%", _percent),
+    SemioticClass(
+        "ordinal",
+        _NB + r"(?P<ord_num>\d+)\s?(?P<ord_suffix>වන|වැනි|වෙනි)" + _WORD_END,
+        _ordinal,
+    ),
+    SemioticClass("number", NUM_RE.pattern, _number),
+]
+
+
+class TextNormalizer:
+    """One compiled alternation over the enabled semiotic classes."""
+
+    def __init__(self, classes: Iterable[SemioticClass] = SEMIOTIC_CLASSES,
+                 enabled: Optional[Iterable[str]] = None, mode: str = "spoken"):
+        if mode not in {"spoken", "digit_by_digit"}:
+            raise ValueError("mode must be 'spoken' or 'digit_by_digit'")
+        classes = list(classes)
+        if enabled is not None:
+            enabled = set(enabled)
+            unknown = enabled - {c.name for c in classes}
+            if unknown:
+                raise ValueError(f"Unknown semiotic classes: {sorted(unknown)}")
+            classes = [c for c in classes if c.name in enabled]
+        self.classes = classes
+        self.mode = mode
+        self._verbalizers: Dict[str, Callable[[re.Match, str], str]] = {c.name: c.verbalize for c in classes}
+        # Each class is the outermost group of its branch, so lastgroup names it
+        self.pattern = re.compile("|".join(f"(?P<{c.name}>{c.pattern})" for c in classes))
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        self.hits: Dict[str, int] = dict.fromkeys(self._verbalizers, 0)
+        self.seconds: Dict[str, float] = dict.fromkeys(self._verbalizers, 0.0)
+        self.calls = 0
+        self.total_seconds = 0.0
+
+    def _replace(self, m: re.Match) -> str:
+        name = m.lastgroup
+        start = time.perf_counter()
+        words = self._verbalizers[name](m, self.mode)
+        self.seconds[name] += time.perf_counter() - start
+        self.hits[name] += 1
+        return words
+
+    def normalize(self, text: str) -> str:
+        """NFC-normalize `text` and replace every semiotic span with Sinhala words."""
+        start = time.perf_counter()
+        text = unicodedata.normalize("NFC", text)
+        out = self.pattern.sub(self._replace, text)
+        self.total_seconds += time.perf_counter() - start
+        self.calls += 1
+        return out
+
+    def stats(self) -> dict:
+        """Per-class hits and verbalizer seconds, plus total normalize() time (scan included)."""
+        return {
+            "calls": self.calls,
+            "total_seconds": self.total_seconds,
+            "classes": {
+                name: {"hits": self.hits[name], "seconds": self.seconds[name]}
+                for name in self._verbalizers
+            },
+        }
+
+
+_default_normalizer: Optional[TextNormalizer] = None
+
+
+def get_normalizer() -> TextNormalizer:
+    """Shared normalizer with all classes enabled (spoken mode)."""
+    global _default_normalizer
+    if _default_normalizer is None:
+        _default_normalizer = TextNormalizer()
+    return _default_normalizer
+
+
+def normalize(text: str) -> str:
+    return get_normalizer().normalize(text)
+
+
+if __name__ == "__main__":
+    examples = [
+        "2025-01-15 දින 10:30 ට රැස්වීම.",
+        "15/08/2024 සිට Rs. 1,500.50 ක් ගෙවන්න.",
+        "අමතන්න 077 123 4567 හෝ +94 11 2345678.",
+        "වට්ටම 25% යි. 3 වන ස්ථානය, 1වැනි දිනය.",
+        "අද 2025 දින රත්මලානේ 1,500ක් සහ 3.14 ක් තියනවා.",
+    ]
+    normalizer = get_normalizer()
+    for ex in examples:
+        print(f"{ex}\n  -> {normalizer.normalize(ex)}")
+    print(normalizer.stats())
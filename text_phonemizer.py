@@ -1,53 +1,236 @@
 import csv
-from phonemizer import phonemize
-from phonemizer.backend.espeak.wrapper import EspeakWrapper
+import io
+import os
+from functools import partial
+from typing import Callable, Dict, Iterator, List, Optional
 
-# For Windows users, specify the path to the eSpeak NG DLL if needed
-# EspeakWrapper.set_library('C:\\Program Files\\eSpeak NG\\libespeak-ng.dll')
+import corpus_parallel
+import phoneme_cache
 
-# For macOS users, specify the path to the eSpeak library if needed
-EspeakWrapper.set_library('/opt/homebrew/Cellar/espeak-ng/1.52.0/lib/libespeak-ng.1.dylib')
+PUNCTUATION_MARKS = ';:,.!?¡¿—…"«»“”‘’\'"()[]{}=+-*/\\'
+SPEAKER = "mettananda"
 
-def convert_file(input_path: str, output_path: str):
-    rows_to_process = []
-    count = 0
-    
-    # First pass: collect all rows that need processing
+# -------------------------
+# Phonemizer backends
+# -------------------------
+# Nothing is loaded at import. The backend is set up on the first
+# phonemize_texts() call, so importing this module is cheap and works on
+# machines without eSpeak.
+#
+# Backend name: configure(backend=...) or $SINHALA_PHONEMIZER_BACKEND
+#   "espeak" - eSpeak NG through phonemizer
+#   "g2p"    - the rule-based g2p.convert_batch()
+#   "auto"   - eSpeak if it can be loaded, otherwise g2p (default)
+#
+# Results are read through the shared on-disk phoneme_cache, keyed by the
+# backend name and version (eSpeak version / g2p rule-set + lexicon), unless
+# configure(use_cache=False) or phonemize_texts(..., use_cache=False).
+#
+# eSpeak library: configure(espeak_library=...) or $PHONEMIZER_ESPEAK_LIBRARY
+#   Windows: C:\Program Files\eSpeak NG\libespeak-ng.dll
+#   macOS:   /opt/homebrew/Cellar/espeak-ng/1.52.0/lib/libespeak-ng.1.dylib
+BACKEND_ENV = "SINHALA_PHONEMIZER_BACKEND"
+ESPEAK_LIBRARY_ENV = "PHONEMIZER_ESPEAK_LIBRARY"
+
+# (texts, njobs) -> IPA strings
+PhonemizeFn = Callable[[List[str], int], List[str]]
+
+_config = {"backend": None, "espeak_library": None, "auto": None, "use_cache": True}
+_loaded: Dict[str, PhonemizeFn] = {}
+
+
+def _load_espeak() -> PhonemizeFn:
+    from phonemizer import phonemize
+    from phonemizer.backend import EspeakBackend
+    from phonemizer.backend.espeak.wrapper import EspeakWrapper
+
+    library = _config["espeak_library"] or os.environ.get(ESPEAK_LIBRARY_ENV)
+    if library:
+        EspeakWrapper.set_library(library)
+    if not EspeakBackend.is_available():
+        raise RuntimeError("eSpeak NG library not found; set " + ESPEAK_LIBRARY_ENV)
+
+    def phonemize_espeak(texts: List[str], njobs: int = 1) -> List[str]:
+        return phonemize(texts, language='si', strip=True, preserve_punctuation=True,
+                         punctuation_marks=PUNCTUATION_MARKS, njobs=njobs)
+    return phonemize_espeak
+
+
+def _espeak_version() -> str:
+    from phonemizer.backend import EspeakBackend
+    return ".".join(map(str, EspeakBackend.version()))
+
+
+def _load_g2p() -> PhonemizeFn:
+    import g2p
+
+    def phonemize_g2p(texts: List[str], njobs: int = 1) -> List[str]:
+        return g2p.convert_batch(texts)
+    return phonemize_g2p
+
+
+def _g2p_version() -> str:
+    import g2p
+    return g2p.pronunciation_version()
+
+
+BACKENDS: Dict[str, Callable[[], PhonemizeFn]] = {
+    "espeak": _load_espeak,
+    "g2p": _load_g2p,
+}
+
+# Backend name -> function returning its current version (part of the cache key)
+BACKEND_VERSIONS: Dict[str, Callable[[], str]] = {
+    "espeak": _espeak_version,
+    "g2p": _g2p_version,
+}
+
+
+def register_backend(name: str, loader: Callable[[], PhonemizeFn],
+                     version: Callable[[], str] = lambda: "0") -> None:
+    """
+    Add a backend; `loader` is called once, on first use, and returns a
+    (texts, njobs) -> IPA list function. Change `version` whenever its output
+    changes, or cached results will be served.
+    """
+    BACKENDS[name] = loader
+    BACKEND_VERSIONS[name] = version
+    _loaded.pop(name, None)
+
+
+def configure(backend: Optional[str] = None, espeak_library: Optional[str] = None,
+              use_cache: bool = True) -> None:
+    """Choose the backend, eSpeak library and caching; takes effect on the next phonemization."""
+    if backend is not None and backend != "auto" and backend not in BACKENDS:
+        raise ValueError(f"Unknown phonemizer backend: {backend!r} (have {sorted(BACKENDS)})")
+    _config["backend"] = backend
+    _config["espeak_library"] = espeak_library
+    _config["auto"] = None
+    _config["use_cache"] = use_cache
+    _loaded.clear()
+
+
+def _load_backend(name: str) -> PhonemizeFn:
+    if name not in _loaded:
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown phonemizer backend: {name!r} (have {sorted(BACKENDS)})")
+        _loaded[name] = BACKENDS[name]()
+    return _loaded[name]
+
+
+def resolve_backend(name: Optional[str] = None) -> str:
+    """Name of the backend that phonemize_texts() will use, loading it if needed."""
+    name = name or _config["backend"] or os.environ.get(BACKEND_ENV) or "auto"
+    if name != "auto":
+        _load_backend(name)
+        return name
+    if _config["auto"] is None:
+        try:
+            _load_backend("espeak")
+            _config["auto"] = "espeak"
+        except (ImportError, OSError, RuntimeError) as e:
+            print(f"eSpeak unavailable ({e}); falling back to the g2p backend.")
+            _load_backend("g2p")
+            _config["auto"] = "g2p"
+    return _config["auto"]
+
+
+def phonemize_texts(texts: List[str], backend: Optional[str] = None, njobs: int = 1,
+                    use_cache: Optional[bool] = None) -> List[str]:
+    """Phonemize a batch of Sinhala texts with the configured backend (`njobs` eSpeak jobs)."""
+    name = resolve_backend(backend)
+    fn = _loaded[name]
+    if not (_config["use_cache"] if use_cache is None else use_cache):
+        return fn(texts, njobs)
+    return phoneme_cache.get_cache().phonemize(
+        texts, name, BACKEND_VERSIONS[name](), lambda missing: fn(missing, njobs))
+
+
+
+def iter_speaker_rows(input_path: str, speaker: str = SPEAKER) -> Iterator[List[str]]:
+    """Yield [file_id, sinhala] for the metadata rows of `speaker`, one at a time."""
     with open(input_path, "r", encoding="utf-8", newline='') as f:
         reader = csv.reader(f, delimiter='|')
-        
         for row in reader:
             if len(row) >= 4:
-                file_id, _, sinhala, speaker = row[:4]
-                if speaker.lower() == "mettananda":
-                    count += 1
+                file_id, _, sinhala, row_speaker = row[:4]
+                if row_speaker.lower() == speaker:
                     sinhala = sinhala.replace("\n", " ").replace("\r", " ").strip()
-                    rows_to_process.append([file_id, sinhala])
-    
-    print(f"Found {count} rows to process. Starting batch phonemization...")
-    
-    # Extract all text for batch processing
-    texts = [row[1] for row in rows_to_process]
-    
-    # Batch phonemize all texts at once
-    phonemized_texts = phonemize(texts, language='si', strip=True, preserve_punctuation=True,punctuation_marks=';:,.!?¡¿—…"«»“”‘’\'"()[]{}=+-*/\\')
-    
-    # Combine results
-    new_rows = []
-    for i, (file_id, original_text) in enumerate(rows_to_process):
-        ipa = phonemized_texts[i]
-        new_rows.append([file_id, original_text, ipa])
-        print(f"[{i+1}/{count}] Processed: {original_text[:50]}...")
-
-    with open(output_path, "w", encoding="utf-8", newline='') as f:
-        writer = csv.writer(f, delimiter='|')
-        writer.writerows(new_rows)
+                    yield [file_id, sinhala]
+
+
+def iter_row_shards(input_path: str, shard_rows: int) -> Iterator[List[List[str]]]:
+    shard = []
+    for row in iter_speaker_rows(input_path):
+        shard.append(row)
+        if len(shard) == shard_rows:
+            yield shard
+            shard = []
+    if shard:
+        yield shard
+
+
+def phonemize_rows(rows: List[List[str]], njobs: int = 1) -> str:
+    """Phonemize one shard of rows and return it as CSV text."""
+    texts = [text for _, text in rows]
+    phonemized_texts = phonemize_texts(texts, njobs=njobs)
+    buf = io.StringIO()
+    writer = csv.writer(buf, delimiter='|')
+    writer.writerows([file_id, text, ipa] for (file_id, text), ipa in zip(rows, phonemized_texts))
+    return buf.getvalue()
+
+
+def convert_file_parallel(input_path: str, output_path: str, workers: Optional[int] = None,
+                          shard_rows: int = 500, resume: bool = True):
+    """
+    Same output as convert_file(), but the rows are phonemized in shards on a
+    process pool, written back in input order, and an interrupted run resumes
+    from the last completed shard.
+    """
+    # Resolve once here so every worker uses the same backend
+    backend = resolve_backend()
+    job = {"input": os.path.abspath(input_path), "shard_rows": shard_rows, "speaker": SPEAKER, "backend": backend}
+    corpus_parallel.run_sharded(
+        iter_row_shards(input_path, shard_rows),
+        phonemize_rows,
+        output_path,
+        job,
+        workers=workers,
+        resume=resume,
+        initializer=configure,
+        initargs=(backend, _config["espeak_library"], _config["use_cache"]),
+    )
+    print(f"[✓] Saved filtered metadata → {output_path}")
+
+
+def convert_file(input_path: str, output_path: str, chunk_rows: int = 1000,
+                 njobs: Optional[int] = None, resume: bool = True):
+    """
+    Phonemize the speaker's metadata rows into `output_path` chunk by chunk.
 
+    Rows are streamed from the input, each chunk of `chunk_rows` is phonemized
+    with `njobs` eSpeak jobs (default: one per core) and appended to the CSV,
+    and a checkpoint after every chunk lets an interrupted run resume from the
+    last completed chunk. Memory use does not grow with the input size.
+    """
+    njobs = njobs or os.cpu_count() or 1
+    backend = resolve_backend()
+    job = {"input": os.path.abspath(input_path), "shard_rows": chunk_rows, "speaker": SPEAKER, "backend": backend}
+    print(f"Phonemizing in chunks of {chunk_rows} rows with {njobs} {backend} jobs...")
+    # workers=0: chunks run in this process, eSpeak parallelizes within each one
+    corpus_parallel.run_sharded(
+        iter_row_shards(input_path, chunk_rows),
+        partial(phonemize_rows, njobs=njobs),
+        output_path,
+        job,
+        workers=0,
+        resume=resume,
+    )
     print(f"[✓] Saved filtered metadata → {output_path}")
 
 if __name__ == "__main__":
     # Example usage
     # convert_file("dataset/original.csv", "phonemized.csv")
 
-    ph = phonemize("ආරම්භයේදී බංග්ලාදේශ කණ්ඩායමේ පිතිකරුවන් ශ්‍රී ලංකා පන්දු යවන්නන් හමුවේ දැඩි පීඩනයකට ලක්ව සිටි අතර, නුවන් තුෂාරගේ පළමු පන්දු වාරයේදී ම පළමු කඩුල්ල ලෙස ටන්සිඩ් හසන් දැවී ගියේ ය.", language='si', strip=True, preserve_punctuation=True,punctuation_marks=';:,.!?¡¿—…"«»“”‘’\'"()[]{}=+-*/\\')
+    ph = phonemize_texts(["ආරම්භයේදී බංග්ලාදේශ කණ්ඩායමේ පිතිකරුවන් ශ්‍රී ලංකා පන්දු යවන්නන් හමුවේ දැඩි පීඩනයකට ලක්ව සිටි අතර, නුවන් තුෂාරගේ පළමු පන්දු වාරයේදී ම පළමු කඩුල්ල ලෙස ටන්සිඩ් හසන් දැවී ගියේ ය."])[0]
     print(ph)
\ No newline at end of file
@@ -8,6 +8,9 @@ from trainer import Trainer, TrainerArgs
 from TTS.tts.configs.shared_configs import CharactersConfig
 from TTS.tts.utils.text import characters
 
+import phoneme_cache
+from sinhala_tokenizer import SymbolTokenizer
+
 dataset_config = BaseDatasetConfig(
     formatter="ljspeech",  # use ljspeech-style metadata format
     meta_file_train="phonemized.csv",
@@ -27,6 +30,12 @@ ap = AudioProcessor.init_from_config(config)
 
 # INITIALIZE THE TOKENIZER
 tokenizer, config = TTSTokenizer.init_from_config(config)
+# Longest-match encoding: one ID per multi-character symbol if the config uses
+# sinhala_tokenizer.SymbolCharacters, plain per-character encoding otherwise
+tokenizer = SymbolTokenizer.from_tokenizer(tokenizer)
+# Phonemize through the shared on-disk cache (only matters with use_phonemes)
+phoneme_cache.attach_phoneme_cache(tokenizer)
+config.phoneme_cache_path = phoneme_cache.coqui_cache_dir()
 
 # LOAD DATA SAMPLES
 train_samples, eval_samples = load_tts_samples(
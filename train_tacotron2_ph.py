@@ -8,6 +8,15 @@ from trainer import Trainer, TrainerArgs
 from TTS.tts.configs.shared_configs import CharactersConfig
 from TTS.tts.utils.text import characters
 
+import phoneme_cache
+import symbols
+from sinhala_tokenizer import PrecomputedIdsTokenizer
+
+# One encoder step per SINHALA_IPA_CHARS entry ("aː", "t͡ʃʰ", ...) instead of
+# one per character. Changes the vocabulary, so it needs a fresh model (no
+# continue_path) and metadata IDs built with g2p.convert_metadata(multichar=True).
+MULTICHAR_SYMBOLS = False
+
 dataset_config = BaseDatasetConfig(
     formatter="ljspeech",  # use ljspeech-style metadata format
     meta_file_train="phonemized.csv",
@@ -16,48 +25,8 @@ dataset_config = BaseDatasetConfig(
 
 from TTS.tts.configs.tacotron2_config import Tacotron2Config
 
-SINHALA_IPA_CHARS = [
-    # Basic vowels (matching the actual phonetic output)
-    'a', 'aː', 'æ', 'æː', 'i', 'iː', 'u', 'uː', 'e', 'eː', 'o', 'oː',
-    # Special vowels
-    'ru', 'ruː', 'li', 'liː',
-    # Additional vowels found in your data
-    'ə', 'ɐ', 'ʊ', 'ɪ',  # schwa, near-open central, near-close near-back rounded, near-close near-front unrounded
-    # Diphthongs
-    'ai', 'au',
-    
-    # Consonants - stops
-    'k', 'kʰ', 'g', 'gʰ', 'ŋ', 'ɡ',  # Added 'ɡ' (script g)
-    't͡ʃ', 't͡ʃʰ', 'd͡ʒ', 'd͡ʒʰ', 'ɲ',
-    'ʈ', 'ʈʰ', 'ɖ', 'ɖʰ', 'ɳ',
-    't̪', 't̪ʰ', 'd̪', 'd̪ʰ', 'n̪',
-    'p', 'pʰ', 'b', 'bʰ', 'm',
-    
-    # Sonorants
-    'j', 'r', 'l', 'w', 'ɭ', 'ɹ',  # Added 'ɹ' (alveolar approximant)
-    
-    # Fricatives
-    'ʃ', 'ʂ', 's', 'h', 'f', 'χ',  # Added 'χ' (voiceless uvular fricative)
-    
-    # Complex/compound consonants
-    'ŋg', 'ɲd͡ʒ', 'ɳɖ', 'n̪d̪', 'mb',
-    'gn',  # for ඥ
-    
-    # Prenasalized consonants (found in your data)
-    'ᵐ', 'ⁿ', 'ᵑ',  # superscript m, n, ng for prenasalization
-    
-    # Special markers for compound sounds
-    'X1', 'X2',  # markers used in the phonetic rules
-    
-    # Numbers
-    '0', '1', '2', '3', '4', '5', '6', '7', '8', '9',
-]
-
-
-
-characters_string = "".join(SINHALA_IPA_CHARS)
-# Include ” and ‘ in punctuation"
-punctuation_string = ".,!?;:=()-[]\"'“”‘’෴ \n\r\t#"
+characters_string = symbols.CHARACTERS
+punctuation_string = symbols.PUNCTUATION
 
 output_path = "output/tacotron2-sinhala"
 
@@ -71,7 +40,14 @@ print(config.test_sentences)
 ap = AudioProcessor.init_from_config(config)
 
 # INITIALIZE THE TOKENIZER
+if MULTICHAR_SYMBOLS:
+    config.characters.characters_class = "sinhala_tokenizer.SymbolCharacters"
 tokenizer, config = TTSTokenizer.init_from_config(config)
+# Use the symbol IDs precomputed by g2p.convert_metadata() where available
+tokenizer = PrecomputedIdsTokenizer.from_tokenizer(tokenizer, "dataset/phonemized_ids.npz")
+# Phonemize through the shared on-disk cache (only matters with use_phonemes)
+phoneme_cache.attach_phoneme_cache(tokenizer)
+config.phoneme_cache_path = phoneme_cache.coqui_cache_dir()
 
 # LOAD DATA SAMPLES
 train_samples, eval_samples = load_tts_samples(
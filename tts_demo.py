@@ -1,37 +1,41 @@
-from ctypes import alignment
-from TTS.utils.synthesizer import Synthesizer
-from TTS.tts.configs.tacotron2_config import Tacotron2Config
-from TTS.tts.models import tacotron2
-from TTS.utils.audio import AudioProcessor
-from TTS.tts.utils.text.tokenizer import TTSTokenizer
-import torch
-from TTS.tts.models.tacotron2 import Tacotron2
-from TTS.tts.utils.synthesis import synthesis
-from TTS.utils import generic_utils
-from TTS.tts.models import setup_model
-from TTS.tts.utils.measures import alignment_diagonal_score
-from TTS.tts.utils.visual import plot_alignment, plot_spectrogram
-from TTS.config import load_config
-import IPython
-from IPython.display import Audio
-import os
-import numpy as np
-import json
+from audio_cache import AudioCache
+from streaming_tts import StreamingSynthesizer
+from tts_inference import get_synthesizer
 
 tts_model_path = "output\\tacotron2-DDC-sinhala\\sinhala-ddc-September-13-2025_02+55AM-cbbc725\\checkpoint_303000.pth"
 tts_config_path = "output\\tacotron2-DDC-sinhala\\sinhala-ddc-September-13-2025_02+55AM-cbbc725\\config.json"
 vocoder_model_path = "C:\\Users\\tumas\\AppData\\Local\\tts\\vocoder_models--en--sam--hifigan_v2\\model_file.pth"
 vocoder_config_path = "C:\\Users\\tumas\\AppData\\Local\\tts\\vocoder_models--en--sam--hifigan_v2\\config.json"
+# Inference-only exports (python inference_checkpoint.py) load memory-mapped
+# and carry their configs:
+# tts_model_path, tts_config_path = "export\\tacotron2.safetensors", None
+# vocoder_model_path, vocoder_config_path = "export\\vocoder.safetensors", None
 
-synthesizer = Synthesizer(
-    tts_checkpoint=tts_model_path,
-    tts_config_path=tts_config_path,
-    vocoder_checkpoint=vocoder_model_path,
-    vocoder_config=vocoder_config_path,
-)
+# Loaded once per process (symbol tokenizer and phoneme cache attached);
+# only torch and the Coqui synthesis modules are imported.
+# mode="int8" quantizes the decoder and fuses the vocoder for faster CPU
+# synthesis (quality report: python quantized_inference.py)
+synthesizer = get_synthesizer(tts_model_path, tts_config_path, vocoder_model_path, vocoder_config_path, mode="fp32")
 text = "ɡowi dʒɐnətaːwəɡeː, dʰiːwəɹə dʒɐnətaːwəɡeː, wɐtu kɐmkəɹuwaːɡeː meː sijəlu ɡ ɹaːmiːjə dʒɐnətaːwəɡeː ɡæʈəlu sɐməɡə kɐʈəjutu kɐɹənəwaː."
-wav = synthesizer.tts(text)
-synthesizer.save_wav(wav, "test.wav")
+# Sentence by sentence: audio is written as soon as each sentence is vocoded.
+# The text is already IPA, so no front-end; pass Sinhala text with the default
+# front-end instead to normalize and phonemize it on the fly.
+# The vocoder runs on 100-frame mel windows, so long sentences start playing
+# before they are fully vocoded and memory stays bounded.
+# Sentences synthesized before come straight from the audio cache.
+streaming = StreamingSynthesizer(synthesizer, frontend=None, vocoder_chunk_frames=100, audio_cache=AudioCache())
+stats = streaming.synthesize_to_file(text, "test.wav")
+print(f"Time to first audio: {stats.ttfa:.2f}s, real-time factor: {stats.rtf:.3f}")
+
+# Manual path (plots alignments and spectrograms; needs the heavy imports):
+# import json
+# import torch
+# from TTS.config import load_config
+# from TTS.tts.models import tacotron2
+# from TTS.tts.utils.synthesis import synthesis
+# from TTS.tts.utils.text.tokenizer import TTSTokenizer
+# from TTS.tts.utils.visual import plot_alignment, plot_spectrogram
+# from TTS.utils.audio import AudioProcessor
 
 # config = load_config(tts_config_path)
 # model = tacotron2.Tacotron2.init_from_config(config)
@@ -64,13 +68,12 @@ synthesizer.save_wav(wav, "test.wav")
 # with open(vocoder_config_path, 'r') as f:
 #     vocoder_config = json.load(f)
 
+# from chunked_vocoder import ChunkedVocoder
 # vocoder = torch.jit.load(vocoder_model_path, map_location=torch.device('cpu'))
-# vocoder.eval()
+# vocoder = ChunkedVocoder(vocoder, hop_length=vocoder_config["audio"]["hop_length"])
 
-# with torch.no_grad():
-#     mel = torch.FloatTensor(postnet_outputs).unsqueeze(0)
-#     audio = vocoder(mel)
-#     audio = audio.squeeze().cpu().numpy()
+# # Fixed-size mel windows with context padding and crossfades: bounded memory
+# audio = vocoder.vocode(postnet_outputs.T)
     
 # # Save using AudioProcessor from TTS
 # ap.save_wav(audio, "testing.wav")
\ No newline at end of file
@@ -0,0 +1,179 @@
+# tts_inference.py
+# Slim inference entry point: everything synthesis needs and nothing else.
+#
+# - No heavy imports at module level: torch and Coqui TTS are imported by
+#   load_synthesizer() the first time a model is loaded (training, plotting
+#   and notebook modules are never imported).
+# - get_synthesizer() keeps one Synthesizer per (TTS checkpoint, vocoder
+#   checkpoint) pair in a process-wide registry, so every caller in the
+#   process (demo, server, batch scheduler) shares one copy of the weights.
+# - Checkpoints exported with inference_checkpoint.py (.safetensors) are
+#   memory-mapped instead of unpickled; their configs are inside the files,
+#   so the config paths can be None.
+# - mode="int8" loads a dynamically quantized Tacotron2 decoder and a fused
+#   vocoder (see quantized_inference.py); fp32 and int8 copies of the same
+#   checkpoints are separate registry entries.
+# - warm_up() runs a short dummy sentence through the streaming path so the
+#   first real request does not pay for lazy initialization (allocator
+#   growth, oneDNN kernel selection, G2P lexicon load).
+#
+# Usage:
+#   synthesizer = get_synthesizer(tts_model_path, tts_config_path,
+#                                 vocoder_model_path, vocoder_config_path)
+#   warm_up(synthesizer)
+#
+# Startup benchmark (import / load / warm-up breakdown):
+#   TTS_MODEL_PATH=... TTS_CONFIG_PATH=... VOCODER_MODEL_PATH=... \
+#   VOCODER_CONFIG_PATH=... python tts_inference.py
+
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+WARMUP_TEXT = "ɡowi dʒɐnətaːwəɡeː."
+WARMUP_SINHALA_TEXT = "ආයුබෝවන්."
+
+MODE_ENV = "TTS_INFERENCE_MODE"
+
+# (tts checkpoint, vocoder checkpoint, mode) -> Synthesizer
+_registry: Dict[Tuple[str, Optional[str], str], object] = {}
+_registry_lock = threading.Lock()
+
+
+def _key(tts_checkpoint: str, vocoder_checkpoint: Optional[str], mode: str) -> Tuple[str, Optional[str], str]:
+    return (os.path.abspath(tts_checkpoint),
+            os.path.abspath(vocoder_checkpoint) if vocoder_checkpoint else None,
+            mode)
+
+
+def load_synthesizer(tts_checkpoint: str, tts_config: Optional[str], vocoder_checkpoint: Optional[str] = None,
+                     vocoder_config: Optional[str] = None, use_cuda: bool = False, mode: str = "fp32"):
+    """Build a Coqui Synthesizer with the Sinhala tokenizer and phoneme cache attached (not registered)."""
+    from phoneme_cache import attach_phoneme_cache
+    from sinhala_tokenizer import attach_symbol_tokenizer
+
+    if any(path and path.endswith(".safetensors") for path in (tts_checkpoint, vocoder_checkpoint)):
+        import inference_checkpoint
+
+        # Decides the format of the TTS model and the vocoder separately
+        synthesizer = inference_checkpoint.load_synthesizer(tts_checkpoint, tts_config, vocoder_checkpoint,
+                                                            vocoder_config, use_cuda)
+    else:
+        from TTS.utils.synthesizer import Synthesizer
+
+        synthesizer = Synthesizer(
+            tts_checkpoint=tts_checkpoint,
+            tts_config_path=tts_config,
+            vocoder_checkpoint=vocoder_checkpoint,
+            vocoder_config=vocoder_config,
+            use_cuda=use_cuda,
+        )
+    if mode != "fp32":
+        import quantized_inference
+
+        quantized_inference.apply_mode(synthesizer, mode)
+    # Models trained with SymbolCharacters need longest-match symbol encoding
+    attach_symbol_tokenizer(synthesizer.tts_model)
+    # Phonemizer models read through the shared on-disk phoneme cache
+    attach_phoneme_cache(synthesizer.tts_model.tokenizer)
+    return synthesizer
+
+
+def get_synthesizer(tts_checkpoint: str, tts_config: Optional[str], vocoder_checkpoint: Optional[str] = None,
+                    vocoder_config: Optional[str] = None, use_cuda: bool = False, mode: str = "fp32"):
+    """Process-wide Synthesizer for this checkpoint pair and mode, loaded on first use."""
+    key = _key(tts_checkpoint, vocoder_checkpoint, mode)
+    synthesizer = _registry.get(key)
+    if synthesizer is None:
+        # One lock for all loads: two threads asking for the same pair must
+        # not deserialize it twice, and loads are rare
+        with _registry_lock:
+            synthesizer = _registry.get(key)
+            if synthesizer is None:
+                synthesizer = load_synthesizer(tts_checkpoint, tts_config, vocoder_checkpoint,
+                                               vocoder_config, use_cuda, mode)
+                _registry[key] = synthesizer
+    return synthesizer
+
+
+def get_synthesizer_from_env():
+    """get_synthesizer() for the TTS_MODEL_PATH, ..., VOCODER_CONFIG_PATH and TTS_INFERENCE_MODE variables."""
+    return get_synthesizer(
+        os.environ["TTS_MODEL_PATH"],
+        os.environ.get("TTS_CONFIG_PATH"),
+        os.environ.get("VOCODER_MODEL_PATH"),
+        os.environ.get("VOCODER_CONFIG_PATH"),
+        mode=os.environ.get(MODE_ENV, "fp32"),
+    )
+
+
+def unload(tts_checkpoint: str, vocoder_checkpoint: Optional[str] = None, mode: str = "fp32") -> bool:
+    """Drop a checkpoint pair from the registry; returns whether it was loaded."""
+    with _registry_lock:
+        return _registry.pop(_key(tts_checkpoint, vocoder_checkpoint, mode), None) is not None
+
+
+def loaded_models() -> list:
+    return list(_registry)
+
+
+def warm_up(synthesizer, text: str = WARMUP_TEXT, vocoder_chunk_frames: Optional[int] = 100,
+            frontend: bool = False) -> float:
+    """
+    Synthesize a dummy sentence (model input text, e.g. IPA) and discard it;
+    with frontend=True also run the normalizer and G2P once. Returns seconds.
+    """
+    from streaming_tts import StreamingSynthesizer, default_frontend
+
+    start = time.perf_counter()
+    if frontend:
+        default_frontend(WARMUP_SINHALA_TEXT)
+    streaming = StreamingSynthesizer(synthesizer, frontend=None, vocoder_chunk_frames=vocoder_chunk_frames)
+    for _ in streaming.stream(text):
+        pass
+    return time.perf_counter() - start
+
+
+# -------------------------
+# Startup benchmark
+# -------------------------
+def startup_benchmark(tts_checkpoint: str, tts_config: Optional[str], vocoder_checkpoint: Optional[str] = None,
+                      vocoder_config: Optional[str] = None, text: str = WARMUP_TEXT, mode: str = "fp32") -> dict:
+    """
+    Time a cold start in this process: imports, model load, warm-up, then a
+    second (warm) synthesis of the same sentence for comparison. Run it in a
+    fresh interpreter, or the import figures only measure the module cache.
+    """
+    timings = {}
+    start = time.perf_counter()
+    import torch  # noqa: F401
+    timings["import_torch"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    import TTS.utils.synthesizer  # noqa: F401
+    import streaming_tts  # noqa: F401
+    timings["import_tts"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    synthesizer = get_synthesizer(tts_checkpoint, tts_config, vocoder_checkpoint, vocoder_config, mode=mode)
+    timings["load"] = time.perf_counter() - start
+
+    timings["warm_up"] = warm_up(synthesizer, text)
+    timings["warm_synthesis"] = warm_up(synthesizer, text)
+    timings["total_startup"] = timings["import_torch"] + timings["import_tts"] + timings["load"] + timings["warm_up"]
+
+    for name, seconds in timings.items():
+        print(f"  {name:<16} {seconds:8.3f}s")
+    return timings
+
+
+if __name__ == "__main__":
+    startup_benchmark(
+        os.environ["TTS_MODEL_PATH"],
+        os.environ.get("TTS_CONFIG_PATH"),
+        os.environ.get("VOCODER_MODEL_PATH"),
+        os.environ.get("VOCODER_CONFIG_PATH"),
+        mode=os.environ.get(MODE_ENV, "fp32"),
+    )
+    print(f"[✓] Startup benchmark done ({len(loaded_models())} model pair(s) loaded)")
@@ -0,0 +1,243 @@
+# tts_server.py
+# Local asyncio HTTP synthesis service (aiohttp) around a Coqui Synthesizer.
+#
+#   POST /synthesize  {"text": "...", "phonemes": false, "deadline": 30}
+#        -> 200 audio/wav, streamed chunk by chunk as sentences are vocoded
+#        -> 503 when the service is full (Retry-After), 504 when the deadline
+#           passes before the first audio is ready
+#   GET  /health      -> queue and worker occupancy
+#
+# Admission control: at most `max_workers` requests run on the model executor
+# and at most `max_queue` more wait for it; anything beyond that is rejected
+# at once instead of piling up. A slot is held until the request's executor
+# job has finished, even if the client already got its 504 or went away.
+# Each request has a deadline (default `default_deadline`, capped by
+# `max_deadline`); a request that has not produced audio by then is dropped,
+# and a stream that overruns it is cut.
+# Audio chunks go from the worker thread to the response through a small
+# bounded queue, so a slow client pauses its own synthesis (backpressure).
+#
+# Repeated prompts are served from an audio_cache.AudioCache (disable with
+# TTS_AUDIO_CACHE=0).
+#
+# The model is loaded (through tts_inference's registry) and warmed up when
+# the app starts, not at import:
+#   TTS_MODEL_PATH=... TTS_CONFIG_PATH=... VOCODER_MODEL_PATH=... \
+#   VOCODER_CONFIG_PATH=... python tts_server.py
+# Add TTS_INFERENCE_MODE=int8 for the quantized CPU models.
+# Drive it with load_test.py.
+
+import asyncio
+import os
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import numpy as np
+from aiohttp import web
+
+from streaming_tts import StreamingSynthesizer, default_frontend
+
+_END = object()
+
+
+def wav_header(sample_rate: int) -> bytes:
+    """16-bit mono WAV header with unknown length, for streaming."""
+    unknown = 0xFFFFFFFF
+    return (b"RIFF" + struct.pack("<I", unknown) + b"WAVE"
+            + b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16)
+            + b"data" + struct.pack("<I", unknown))
+
+
+def to_pcm16(chunk: np.ndarray) -> bytes:
+    return (np.clip(chunk, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+class SynthesisService:
+    """Admission control, deadlines and streaming around one Synthesizer."""
+
+    def __init__(self, synthesizer, max_workers: int = 2, max_queue: int = 8,
+                 default_deadline: float = 30.0, max_deadline: float = 120.0,
+                 chunk_queue_size: int = 4, vocoder_chunk_frames: Optional[int] = 100,
+                 audio_cache=None):
+        self.synthesizer = synthesizer
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.default_deadline = default_deadline
+        self.max_deadline = max_deadline
+        # The producer may add two more items after a cancel; never block on them
+        self.chunk_queue_size = max(chunk_queue_size, 2)
+        self.vocoder_chunk_frames = vocoder_chunk_frames
+        self.audio_cache = audio_cache
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="tts")
+        self.admitted = 0
+        self.running = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.completed = 0
+
+    def _count_running(self, delta: int) -> None:
+        self.running += delta
+
+    def _stream(self, text: str, phonemes: bool, deadline: float, cancelled: threading.Event,
+                loop: asyncio.AbstractEventLoop, chunks: asyncio.Queue) -> None:
+        """Runs on the executor: synthesize and hand chunks to the event loop."""
+
+        def put(item) -> None:
+            asyncio.run_coroutine_threadsafe(chunks.put(item), loop).result()
+
+        # Shared counters are only ever touched on the event loop
+        loop.call_soon_threadsafe(self._count_running, 1)
+        try:
+            if cancelled.is_set() or time.monotonic() > deadline:
+                put(TimeoutError("deadline passed while queued"))
+                return
+            streaming = StreamingSynthesizer(
+                self.synthesizer,
+                frontend=None if phonemes else default_frontend,
+                vocoder_chunk_frames=self.vocoder_chunk_frames,
+                audio_cache=self.audio_cache,
+            )
+            stream = streaming.stream(text)
+            try:
+                for chunk in stream:
+                    if cancelled.is_set() or time.monotonic() > deadline:
+                        put(TimeoutError("deadline passed while streaming"))
+                        return
+                    put(chunk)
+            finally:
+                stream.close()
+            put(_END)
+        except BaseException as e:
+            put(e)
+        finally:
+            loop.call_soon_threadsafe(self._count_running, -1)
+
+    async def handle_synthesize(self, request: web.Request) -> web.StreamResponse:
+        # Fast rejection before reading anything else; the slot is taken at
+        # once so requests still reading their bodies count against capacity
+        if self.admitted >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            return web.json_response({"error": "overloaded"}, status=503, headers={"Retry-After": "1"})
+        self.admitted += 1
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue(self.chunk_queue_size)
+        cancelled = threading.Event()
+        job: Optional[asyncio.Future] = None
+        response: Optional[web.StreamResponse] = None
+        try:
+            try:
+                body = await request.json()
+                text = str(body["text"])
+                budget = min(float(body.get("deadline", self.default_deadline)), self.max_deadline)
+            except (ValueError, KeyError, TypeError, AttributeError):
+                return web.json_response({"error": "expected JSON with a 'text' field"}, status=400)
+            deadline = time.monotonic() + budget
+
+            job = loop.run_in_executor(self.executor, self._stream, text, bool(body.get("phonemes")),
+                                       deadline, cancelled, loop, chunks)
+            while True:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = await asyncio.wait_for(chunks.get(), max(timeout, 0))
+                except asyncio.TimeoutError:
+                    item = TimeoutError("deadline passed")
+                if isinstance(item, TimeoutError):
+                    self.timed_out += 1
+                    if response is None:
+                        return web.json_response({"error": str(item)}, status=504)
+                    break
+                if isinstance(item, BaseException):
+                    if response is None:
+                        return web.json_response({"error": repr(item)}, status=500)
+                    break
+                if response is None:
+                    response = web.StreamResponse(headers={"Content-Type": "audio/wav"})
+                    response.enable_chunked_encoding()
+                    await response.prepare(request)
+                    await response.write(wav_header(self.synthesizer.output_sample_rate))
+                if item is _END:
+                    self.completed += 1
+                    await response.write_eof()
+                    return response
+                await response.write(to_pcm16(item))
+            # Headers are already sent: drop the connection so the client sees
+            # a truncated response rather than a complete one
+            if request.transport is not None:
+                request.transport.close()
+        finally:
+            cancelled.set()
+            # Let a producer blocked on the full chunk queue finish
+            while not chunks.empty():
+                chunks.get_nowait()
+            if job is None:
+                self.admitted -= 1
+            else:
+                # A timed-out or disconnected request's job may still be
+                # running; its slot is only free once the job has finished
+                job.add_done_callback(self._release)
+        return response
+
+    def _release(self, job: asyncio.Future) -> None:
+        """Done callback of an executor job (on the event loop): free its admission slot."""
+        self.admitted -= 1
+        if not job.cancelled():
+            job.exception()  # retrieved, so asyncio does not log it
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "admitted": self.admitted,
+            "running": self.running,
+            "capacity": self.max_workers + self.max_queue,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "completed": self.completed,
+            "audio_cache": self.audio_cache.stats() if self.audio_cache is not None else None,
+        })
+
+
+def create_app(load_synthesizer: Callable[[], object], **service_kwargs) -> web.Application:
+    """aiohttp app that loads the Synthesizer on startup and serves it."""
+    app = web.Application()
+
+    async def on_startup(app: web.Application) -> None:
+        synthesizer = await asyncio.get_running_loop().run_in_executor(None, load_synthesizer)
+        app["service"] = SynthesisService(synthesizer, **service_kwargs)
+
+    async def on_cleanup(app: web.Application) -> None:
+        app["service"].executor.shutdown(wait=False, cancel_futures=True)
+
+    async def synthesize(request: web.Request) -> web.StreamResponse:
+        return await request.app["service"].handle_synthesize(request)
+
+    async def health(request: web.Request) -> web.Response:
+        return await request.app["service"].handle_health(request)
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    app.router.add_post("/synthesize", synthesize)
+    app.router.add_get("/health", health)
+    return app
+
+
+def load_synthesizer_from_env():
+    from tts_inference import get_synthesizer_from_env, warm_up
+
+    synthesizer = get_synthesizer_from_env()
+    # Pay for lazy initialization before the first request, not during it
+    warm_up(synthesizer, frontend=True)
+    return synthesizer
+
+
+if __name__ == "__main__":
+    from audio_cache import AudioCache
+
+    app = create_app(
+        load_synthesizer_from_env,
+        audio_cache=AudioCache() if os.environ.get("TTS_AUDIO_CACHE", "1") != "0" else None,
+        max_workers=int(os.environ.get("TTS_WORKERS", 2)),
+        max_queue=int(os.environ.get("TTS_QUEUE", 8)),
+    )
+    web.run_app(app, host=os.environ.get("TTS_HOST", "127.0.0.1"), port=int(os.environ.get("TTS_PORT", 8080)))